@@ -4,6 +4,7 @@ import logging
 import asyncio
 import sys
 import time
+import threading
 from contextlib import asynccontextmanager
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
@@ -94,6 +95,8 @@ import re
 
 from core.agent import IntelligentChatAgent
 from core.supabase_service import SupabaseService
+from tools.sheets_tools import flush_leads
+from tools.supabase_tools import flush_lead_writes
 
 # Configure logging with production-ready settings
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -206,6 +209,9 @@ async def lifespan(app: FastAPI):
                     supabase_key=supabase_key
                 )
                 logger.info("✓ Supabase service initialized successfully")
+                
+                # Fill the read cache in the background so the first chats don't pay for it
+                threading.Thread(target=supabase_service.prewarm, name="supabase-prewarm", daemon=True).start()
             except Exception as supabase_error:
                 # Supabase initialization failed - log warning but don't crash app
                 logger.warning("=" * 70)
@@ -262,6 +268,16 @@ async def lifespan(app: FastAPI):
     
     # Shutdown: Cleanup
     logger.info("Shutting down...")
+    
+    # Finish lead upserts and write any rows still queued for Google Sheets
+    flush_leads()
+    
+    # Write any leads still queued for Supabase
+    flush_lead_writes()
+    
+    # Close pooled Supabase HTTP connections
+    if supabase_service:
+        supabase_service.close()
 
 
 # ============================================================================
@@ -538,8 +554,8 @@ async def debug_supabase():
             "supabase_url": os.getenv("SUPABASE_URL", "Not set"),
             "connection": "ok",
             "test_query": "successful",
-            "cache_enabled": False,
-            "note": "Caching disabled - all queries go directly to database"
+            "cache_enabled": True,
+            "note": "Read queries are cached in-process for a short TTL; use /admin/cache/clear to refresh"
         }
     except Exception as e:
         return {
@@ -552,13 +568,10 @@ async def debug_supabase():
 
 @app.post("/admin/cache/clear", tags=["Admin"], dependencies=[Depends(verify_api_key)])
 async def clear_cache(table: Optional[str] = None):
-    """Clear cache endpoint - kept for API compatibility.
-    
-    Note: Caching is disabled - all queries go directly to the database.
-    This endpoint is a no-op but kept for backward compatibility.
+    """Clear the Supabase read cache, e.g. after editing course data.
     
     Args:
-        table: Optional table name (ignored - no cache to clear)
+        table: Optional table name (e.g. "course_details"); clears everything if omitted
     """
     if not supabase_service:
         raise HTTPException(
@@ -569,8 +582,7 @@ async def clear_cache(table: Optional[str] = None):
     supabase_service.clear_cache(table)
     return {
         "status": "success",
-        "message": "Cache clear requested (caching is disabled - all queries are direct DB calls)",
-        "note": "No cache exists - all queries already go directly to Supabase database"
+        "message": f"Cache cleared for table '{table}'" if table else "Cache cleared for all tables"
     }
 
 
@@ -1,23 +1,91 @@
-"""Supabase database service - direct database calls, no caching."""
+"""Supabase database service - database calls with a short-lived read cache."""
 import os
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import List, Optional, Dict, Any
 import time
 
 logger = logging.getLogger(__name__)
 
 try:
-    from supabase import create_client, Client
+    import httpx
+    from supabase import create_client, Client, ClientOptions
     SUPABASE_AVAILABLE = True
 except ImportError:
     SUPABASE_AVAILABLE = False
     logger.warning("Supabase client not installed. Install with: pip install supabase")
 
+# Read results are kept in-process for a short time: within a conversation the
+# agent asks for the same course, FAQ and company rows again and again, and
+# each of those is a full round-trip to Supabase. FAQs get a shorter TTL.
+CACHE_TTL_SECONDS = 60
+FAQ_CACHE_TTL_SECONDS = 15
+CACHE_MAX_ENTRIES = 1024
+# "Not found" results are cached too (the agent often retries the same wrong
+# course name), but only briefly so a newly added row shows up quickly.
+NEGATIVE_CACHE_TTL_SECONDS = 30
+
+# One pooled HTTP client carries every PostgREST request. httpx closes idle
+# connections after 5s by default, so most chat turns paid a new TLS handshake;
+# idle connections are kept long enough to span the gap between messages.
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 60
+HTTP_TIMEOUT_SECONDS = 120
+
+# Postgres function (see supabase_schema.sql) that ranks FAQs by full-text match
+# and returns only the top rows. Databases without it, or searches it finds
+# nothing for, fall back to substring matching on question/answer.
+FAQ_SEARCH_FUNCTION = "faqs_search"
+# PostgREST error code for a function missing from its schema cache
+_MISSING_FUNCTION_CODE = "PGRST202"
+
+# After a connection-level failure (Supabase unreachable or timing out), reads
+# fail fast for CIRCUIT_OPEN_SECONDS instead of every tool call waiting out
+# HTTP_TIMEOUT_SECONDS; the first read after that window tries the database again.
+CIRCUIT_OPEN_SECONDS = 30
+
+# Failed queries always log an error line, but the full traceback only once per
+# TRACEBACK_LOG_INTERVAL_SECONDS per method: while Supabase is down or rate
+# limiting, every tool call fails the same way and tracebacks would flood the logs.
+TRACEBACK_LOG_INTERVAL_SECONDS = 10
+_last_traceback_at: Dict[str, float] = {}
+
+
+class SupabaseUnavailableError(RuntimeError):
+    """Raised by reads while Supabase can't be reached (connection failed or circuit open).
+    
+    Unlike other query errors, the get_* methods don't turn this into an empty
+    result, so callers can tell "database down" apart from "no rows found".
+    """
+
+
+def _traceback_due(method: str) -> bool:
+    """True if a traceback for method hasn't been logged in the last interval."""
+    now = time.time()
+    if now - _last_traceback_at.get(method, 0.0) >= TRACEBACK_LOG_INTERVAL_SECONDS:
+        _last_traceback_at[method] = now
+        return True
+    return False
+
+
+
+def _cache_arg(value: Optional[str]) -> Optional[str]:
+    """Cache-key form of an ilike filter argument (ilike ignores case)."""
+    return value.lower() if value else value
+
 
 class SupabaseService:
-    """Supabase service with direct database calls - no caching.
+    """Supabase service with a small in-process read cache.
     
-    All queries go directly to the database for real-time data.
+    Read queries are cached per table and arguments for CACHE_TTL_SECONDS
+    (least recently used entries are evicted past CACHE_MAX_ENTRIES). Cached
+    rows are shared between callers and must be treated as read-only.
+    After a connection failure, reads raise SupabaseUnavailableError
+    (without trying the database) for CIRCUIT_OPEN_SECONDS.
+    Lead writes always go straight to the database.
     """
     
     def __init__(self, supabase_url: Optional[str] = None, supabase_key: Optional[str] = None):
@@ -33,164 +101,401 @@ class SupabaseService:
                 "Supabase credentials not found. Please set SUPABASE_URL and SUPABASE_KEY environment variables."
             )
         
+        # (table, method, *args) -> (expires_at, rows)
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._cache_lock = threading.RLock()
+        # Keys currently being queried -> event set when that query finishes
+        self._inflight: Dict[tuple, threading.Event] = {}
+        # Reads are skipped until this time after a connection failure
+        self._circuit_open_until = 0.0
+        # Cleared once the database turns out not to have FAQ_SEARCH_FUNCTION
+        self._faq_search_available = True
+        
         try:
-            self.client: Client = create_client(self.supabase_url, self.supabase_key)
-            logger.info("✓ Supabase client initialized successfully (no caching - direct DB calls)")
+            self.http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                timeout=HTTP_TIMEOUT_SECONDS,
+                follow_redirects=True,
+                http2=True,
+            )
+            self.client: Client = create_client(
+                self.supabase_url,
+                self.supabase_key,
+                options=ClientOptions(httpx_client=self.http_client),
+            )
+            logger.info("✓ Supabase client initialized successfully")
         except Exception as e:
             raise RuntimeError(f"Failed to initialize Supabase client: {str(e)}") from e
     
+    def close(self):
+        """Close the pooled HTTP connections."""
+        self.http_client.close()
+    
+    def _circuit_open(self) -> bool:
+        """True while reads are being skipped after a connection failure."""
+        return time.time() < self._circuit_open_until
+    
+    def _execute(self, query):
+        """Run a read query, raising SupabaseUnavailableError while Supabase is unreachable."""
+        if self._circuit_open():
+            raise SupabaseUnavailableError("Supabase unreachable - skipping query until the connection is retried")
+        try:
+            return query.execute()
+        except httpx.TransportError as e:
+            self._circuit_open_until = time.time() + CIRCUIT_OPEN_SECONDS
+            logger.warning(f"Supabase connection failed ({e!r}) - failing reads fast for {CIRCUIT_OPEN_SECONDS}s")
+            raise SupabaseUnavailableError(f"Supabase connection failed: {e}") from e
+    
+    def _cache_get(self, key: tuple) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.time() >= expires_at:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+    
+    def _cache_set(self, key: tuple, value: Any, ttl: float = CACHE_TTL_SECONDS):
+        """Store value under key for ttl seconds, evicting the least recently used entries."""
+        with self._cache_lock:
+            self._cache[key] = (time.time() + ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+    
+    @contextmanager
+    def _read_through(self, key: tuple):
+        """Yield the cached value for key, or None when the caller should query it.
+        
+        Only one caller at a time queries a given key: concurrent callers wait
+        for that query and then get its cached result, so N simultaneous misses
+        cost one database call. If the query failed (nothing cached), waiters
+        get None and query themselves.
+        """
+        with self._cache_lock:
+            cached = self._cache_get(key)
+            event = self._inflight.get(key) if cached is None else None
+            leader = cached is None and event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        
+        if not leader:
+            if event is not None:
+                event.wait()
+                cached = self._cache_get(key)
+            yield cached
+            return
+        
+        try:
+            yield None
+        finally:
+            with self._cache_lock:
+                self._inflight.pop(key, None)
+            event.set()
+    
+    def _cache_result(self, key: tuple, data: Any, ttl: float = CACHE_TTL_SECONDS):
+        """Cache a successful query result; empty results expire after NEGATIVE_CACHE_TTL_SECONDS at most.
+        
+        Empty results aren't cached while the circuit is open: a query that
+        finished as the connection dropped shouldn't leave a "not found" behind.
+        """
+        if not data and self._circuit_open():
+            return
+        self._cache_set(key, data, ttl if data else min(ttl, NEGATIVE_CACHE_TTL_SECONDS))
+    
     def clear_cache(self, table: Optional[str] = None):
-        """Clear cache endpoint - kept for API compatibility, but no-op since caching is disabled.
+        """Drop cached read results.
         
         Args:
-            table: Optional table name (ignored - no cache to clear)
+            table: Only drop results read from this table (e.g. "course_details"); all if None
         """
-        logger.debug("clear_cache called but caching is disabled - no action taken")
+        with self._cache_lock:
+            if table is None:
+                cleared = len(self._cache)
+                self._cache.clear()
+            else:
+                keys = [key for key in self._cache if key[0] == table]
+                for key in keys:
+                    del self._cache[key]
+                cleared = len(keys)
+        logger.info("Cleared %d cached Supabase read(s)%s", cleared, f" for table '{table}'" if table else "")
     
-    def get_course_links(self, course_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get course links - direct database call, no caching."""
+    def prewarm(self, faq_limit: int = 5):
+        """Load the rows the agent asks for most into the read cache.
+        
+        Reads the course list, then the links and details for each listed course,
+        the company info and the top FAQs, so the first chat turns after startup
+        are cache hits (and the HTTP connections are already open). Meant to run
+        on a background thread; the get_* calls log their own errors, and warming
+        stops early if Supabase is unreachable.
+        
+        Args:
+            faq_limit: FAQ count to warm, matching fetch_faqs' default top_k
+        """
         start_time = time.time()
         try:
-            query = self.client.table("course_links").select("course_name,demo_link,pdf_link,course_link")
-            
-            if course_name:
-                query = query.ilike("course_name", f"%{course_name}%").limit(1)
-            else:
-                query = query.limit(10)
-            
-            response = query.execute()
-            data = response.data if response.data else []
+            courses = self.get_course_links()
+            for course in courses:
+                course_name = course.get("course_name")
+                if course_name:
+                    self.get_course_links(course_name)
+                    self.get_course_details(course_name)
+            self.get_course_names()
+            self.get_company_info()
+            self.get_faqs(limit=faq_limit)
+        except SupabaseUnavailableError as e:
+            logger.warning(f"Skipped prewarming the Supabase read cache: {e}")
+            return
+        
+        elapsed = (time.time() - start_time) * 1000
+        logger.info("Prewarmed Supabase read cache (%d courses) in %.2fms", len(courses), elapsed)
+    
+    def get_course_links(self, course_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get course links (cached for CACHE_TTL_SECONDS)."""
+        key = ("course_links", "get_course_links", _cache_arg(course_name))
+        with self._read_through(key) as cached:
+            if cached is not None:
+                return cached
             
-            elapsed = (time.time() - start_time) * 1000
-            logger.debug(f"get_course_links: {elapsed:.2f}ms (direct DB)")
-            return data
-        except Exception as e:
-            elapsed = (time.time() - start_time) * 1000
-            logger.error(f"Error fetching course links ({elapsed:.2f}ms): {e}", exc_info=True)
-            return []
+            start_time = time.time()
+            try:
+                query = self.client.table("course_links").select("course_name,demo_link,pdf_link,course_link")
+                
+                if course_name:
+                    query = query.ilike("course_name", f"%{course_name}%").limit(1)
+                else:
+                    query = query.limit(10)
+                
+                response = self._execute(query)
+                data = response.data if response.data else []
+                
+                elapsed = (time.time() - start_time) * 1000
+                logger.debug(f"get_course_links: {elapsed:.2f}ms (direct DB)")
+                self._cache_result(key, data)
+                return data
+            except SupabaseUnavailableError:
+                raise
+            except Exception as e:
+                elapsed = (time.time() - start_time) * 1000
+                logger.error(f"Error fetching course links ({elapsed:.2f}ms): {e}", exc_info=_traceback_due("get_course_links"))
+                return []
     
     def get_course_details(self, course_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get course details - direct database call, no caching."""
-        start_time = time.time()
-        try:
-            query = self.client.table("course_details").select("*")
+        """Get course details (cached for CACHE_TTL_SECONDS)."""
+        key = ("course_details", "get_course_details", _cache_arg(course_name))
+        with self._read_through(key) as cached:
+            if cached is not None:
+                return cached
             
-            if course_name:
-                query = query.ilike("course_name", f"%{course_name}%").limit(1)
-            else:
-                query = query.limit(10)
-            
-            response = query.execute()
-            data = response.data if response.data else []
+            start_time = time.time()
+            try:
+                query = self.client.table("course_details").select("*")
+                
+                if course_name:
+                    query = query.ilike("course_name", f"%{course_name}%").limit(1)
+                else:
+                    query = query.limit(10)
+                
+                response = self._execute(query)
+                data = response.data if response.data else []
+                
+                elapsed = (time.time() - start_time) * 1000
+                logger.debug(f"get_course_details: {elapsed:.2f}ms (direct DB)")
+                self._cache_result(key, data)
+                return data
+            except SupabaseUnavailableError:
+                raise
+            except Exception as e:
+                elapsed = (time.time() - start_time) * 1000
+                logger.error(f"Error fetching course details ({elapsed:.2f}ms): {e}", exc_info=_traceback_due("get_course_details"))
+                return []
+    
+    def get_course_names(self) -> List[str]:
+        """Get every course name, for matching misspelled names (cached for CACHE_TTL_SECONDS)."""
+        key = ("course_details", "get_course_names")
+        with self._read_through(key) as cached:
+            if cached is not None:
+                return cached
             
-            elapsed = (time.time() - start_time) * 1000
-            logger.debug(f"get_course_details: {elapsed:.2f}ms (direct DB)")
-            return data
-        except Exception as e:
-            elapsed = (time.time() - start_time) * 1000
-            logger.error(f"Error fetching course details ({elapsed:.2f}ms): {e}", exc_info=True)
-            return []
+            start_time = time.time()
+            try:
+                response = self._execute(self.client.table("course_details").select("course_name").limit(1000))
+                data = [row["course_name"] for row in response.data or [] if row.get("course_name")]
+                
+                elapsed = (time.time() - start_time) * 1000
+                logger.debug(f"get_course_names: {elapsed:.2f}ms (direct DB)")
+                self._cache_result(key, data)
+                return data
+            except SupabaseUnavailableError:
+                raise
+            except Exception as e:
+                elapsed = (time.time() - start_time) * 1000
+                logger.error(f"Error fetching course names ({elapsed:.2f}ms): {e}", exc_info=_traceback_due("get_course_names"))
+                return []
     
     def get_faqs(self, query_text: Optional[str] = None, course_name: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
-        """Get FAQs - direct database call, no caching."""
-        start_time = time.time()
-        try:
-            query = self.client.table("faqs").select("faq,course_name,question,answer")
-            
-            if course_name:
-                query = query.ilike("course_name", f"%{course_name}%")
+        """Get FAQs (cached for FAQ_CACHE_TTL_SECONDS)."""
+        key = ("faqs", "get_faqs", _cache_arg(query_text), _cache_arg(course_name), limit)
+        with self._read_through(key) as cached:
+            if cached is not None:
+                return cached
             
-            if query_text:
-                query = query.or_(f"question.ilike.%{query_text}%,answer.ilike.%{query_text}%")
-            
-            query = query.limit(limit)
-            response = query.execute()
-            data = response.data if response.data else []
-            
-            elapsed = (time.time() - start_time) * 1000
-            logger.debug(f"get_faqs: {elapsed:.2f}ms (direct DB)")
-            return data
+            start_time = time.time()
+            try:
+                data = self._search_faqs(query_text, course_name, limit) if query_text else []
+                
+                if not data:
+                    query = self.client.table("faqs").select("faq,course_name,question,answer")
+                    
+                    if course_name:
+                        query = query.ilike("course_name", f"%{course_name}%")
+                    
+                    if query_text:
+                        query = query.or_(f"question.ilike.%{query_text}%,answer.ilike.%{query_text}%")
+                    
+                    query = query.limit(limit)
+                    response = self._execute(query)
+                    data = response.data if response.data else []
+                
+                elapsed = (time.time() - start_time) * 1000
+                logger.debug(f"get_faqs: {elapsed:.2f}ms (direct DB)")
+                self._cache_result(key, data, FAQ_CACHE_TTL_SECONDS)
+                return data
+            except SupabaseUnavailableError:
+                raise
+            except Exception as e:
+                elapsed = (time.time() - start_time) * 1000
+                logger.error(f"Error fetching FAQs ({elapsed:.2f}ms): {e}", exc_info=_traceback_due("get_faqs"))
+                return []
+    
+    def _search_faqs(self, query_text: str, course_name: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """Top FAQs ranked by full-text match in the database ([] if the function isn't deployed)."""
+        if not self._faq_search_available:
+            return []
+        try:
+            response = self._execute(self.client.rpc(FAQ_SEARCH_FUNCTION, {"q": query_text, "course": course_name, "k": limit}))
         except Exception as e:
-            elapsed = (time.time() - start_time) * 1000
-            logger.error(f"Error fetching FAQs ({elapsed:.2f}ms): {e}", exc_info=True)
+            if getattr(e, "code", None) != _MISSING_FUNCTION_CODE:
+                raise
+            logger.warning(f"{FAQ_SEARCH_FUNCTION}() not found in Supabase - using substring FAQ search (see supabase_schema.sql)")
+            self._faq_search_available = False
             return []
+        return response.data or []
     
     def get_professor_info(self, professor_name: Optional[str] = None, course_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get professor info - direct database call, no caching."""
-        start_time = time.time()
-        try:
-            query = self.client.table("about_professor").select("*")
-            
-            if professor_name:
-                query = query.ilike("full_name", f"%{professor_name}%").limit(5)
-            elif course_name:
-                query = query.ilike("courses_currently_teaching", f"%{course_name}%").limit(5)
-            else:
-                query = query.limit(10)
-            
-            response = query.execute()
-            data = response.data if response.data else []
+        """Get professor info (cached for CACHE_TTL_SECONDS)."""
+        key = ("about_professor", "get_professor_info", _cache_arg(professor_name), _cache_arg(course_name))
+        with self._read_through(key) as cached:
+            if cached is not None:
+                return cached
             
-            elapsed = (time.time() - start_time) * 1000
-            logger.debug(f"get_professor_info: {elapsed:.2f}ms (direct DB)")
-            return data
-        except Exception as e:
-            elapsed = (time.time() - start_time) * 1000
-            logger.error(f"Error fetching professor info ({elapsed:.2f}ms): {e}", exc_info=True)
-            return []
+            start_time = time.time()
+            try:
+                # Only the columns the agent shows (skips the long website bio)
+                query = self.client.table("about_professor").select(
+                    "full_name,display_name_for_students,qualifications,total_years_of_experience,"
+                    "specializations,courses_currently_teaching,certifications,short_bio_for_agent"
+                )
+                
+                if professor_name:
+                    query = query.ilike("full_name", f"%{professor_name}%").limit(5)
+                elif course_name:
+                    query = query.ilike("courses_currently_teaching", f"%{course_name}%").limit(5)
+                else:
+                    query = query.limit(10)
+                
+                response = self._execute(query)
+                data = response.data if response.data else []
+                
+                elapsed = (time.time() - start_time) * 1000
+                logger.debug(f"get_professor_info: {elapsed:.2f}ms (direct DB)")
+                self._cache_result(key, data)
+                return data
+            except SupabaseUnavailableError:
+                raise
+            except Exception as e:
+                elapsed = (time.time() - start_time) * 1000
+                logger.error(f"Error fetching professor info ({elapsed:.2f}ms): {e}", exc_info=_traceback_due("get_professor_info"))
+                return []
     
     def get_company_info(self, field_name: Optional[str] = None) -> Dict[str, Any]:
-        """Get company info - direct database call, no caching."""
-        start_time = time.time()
-        try:
-            query = self.client.table("company_info").select("field_name,field_value,notes")
-            
-            if field_name:
-                query = query.eq("field_name", field_name).limit(1)
-            else:
-                query = query.limit(100)
-            
-            response = query.execute()
+        """Get company info (cached for CACHE_TTL_SECONDS)."""
+        # field_name is matched with eq, so the key keeps its case
+        key = ("company_info", "get_company_info", field_name)
+        with self._read_through(key) as cached:
+            if cached is not None:
+                return cached
             
-            if response.data:
+            start_time = time.time()
+            try:
+                query = self.client.table("company_info").select("field_name,field_value,notes")
+                
                 if field_name:
-                    if len(response.data) > 0:
-                        data = {response.data[0]["field_name"]: response.data[0]["field_value"]}
+                    query = query.eq("field_name", field_name).limit(1)
+                else:
+                    query = query.limit(100)
+                
+                response = self._execute(query)
+                
+                if response.data:
+                    if field_name:
+                        if len(response.data) > 0:
+                            data = {response.data[0]["field_name"]: response.data[0]["field_value"]}
+                        else:
+                            data = {}
                     else:
-                        data = {}
+                        data = {row["field_name"]: row["field_value"] for row in response.data if row.get("field_name")}
                 else:
-                    data = {row["field_name"]: row["field_value"] for row in response.data if row.get("field_name")}
-            else:
-                data = {}
-            
-            elapsed = (time.time() - start_time) * 1000
-            logger.debug(f"get_company_info: {elapsed:.2f}ms (direct DB)")
-            return data
-        except Exception as e:
-            elapsed = (time.time() - start_time) * 1000
-            logger.error(f"Error fetching company info ({elapsed:.2f}ms): {e}", exc_info=True)
-            return {}
+                    data = {}
+                
+                elapsed = (time.time() - start_time) * 1000
+                logger.debug(f"get_company_info: {elapsed:.2f}ms (direct DB)")
+                self._cache_result(key, data)
+                return data
+            except SupabaseUnavailableError:
+                raise
+            except Exception as e:
+                elapsed = (time.time() - start_time) * 1000
+                logger.error(f"Error fetching company info ({elapsed:.2f}ms): {e}", exc_info=_traceback_due("get_company_info"))
+                return {}
     
     def search_courses(self, search_term: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search courses (no cache - always fresh)."""
-        start_time = time.time()
-        try:
-            query = self.client.table("course_details").select("course_name,course_description")
-            if search_term:
-                query = query.or_(
-                    f"course_name.ilike.%{search_term}%,course_description.ilike.%{search_term}%"
-                ).limit(limit)
-            else:
-                query = query.limit(limit)
+        """Search courses (cached for CACHE_TTL_SECONDS)."""
+        key = ("course_details", "search_courses", _cache_arg(search_term), limit)
+        with self._read_through(key) as cached:
+            if cached is not None:
+                return cached
             
-            response = query.execute()
-            elapsed = (time.time() - start_time) * 1000
-            logger.debug(f"search_courses: {elapsed:.2f}ms")
-            return response.data if response.data else []
-        except Exception as e:
-            elapsed = (time.time() - start_time) * 1000
-            logger.error(f"Error searching courses ({elapsed:.2f}ms): {e}", exc_info=True)
-            return []
+            start_time = time.time()
+            try:
+                query = self.client.table("course_details").select("course_name,course_description")
+                if search_term:
+                    query = query.or_(
+                        f"course_name.ilike.%{search_term}%,course_description.ilike.%{search_term}%"
+                    ).limit(limit)
+                else:
+                    query = query.limit(limit)
+                
+                response = self._execute(query)
+                data = response.data if response.data else []
+                elapsed = (time.time() - start_time) * 1000
+                logger.debug(f"search_courses: {elapsed:.2f}ms")
+                self._cache_result(key, data)
+                return data
+            except SupabaseUnavailableError:
+                raise
+            except Exception as e:
+                elapsed = (time.time() - start_time) * 1000
+                logger.error(f"Error searching courses ({elapsed:.2f}ms): {e}", exc_info=_traceback_due("search_courses"))
+                return []
 
     def append_lead_data(
         self,
@@ -202,7 +507,7 @@ class SupabaseService:
         notes: Optional[str] = None,
         add_timestamp: bool = False
     ) -> Dict[str, Any]:
-        """Append or update lead data in Supabase - direct database call, no caching.
+        """Append or update lead data in Supabase - direct database call, never cached.
 
         This method will:
         1. Search for existing lead by phone or name
@@ -324,7 +629,7 @@ class SupabaseService:
 
         except Exception as e:
             elapsed = (time.time() - start_time) * 1000
-            logger.error(f"Error appending lead data ({elapsed:.2f}ms): {e}", exc_info=True)
+            logger.error(f"Error appending lead data ({elapsed:.2f}ms): {e}", exc_info=_traceback_due("append_lead_data"))
             return {
                 "status": "error",
                 "message": f"Error saving lead data: {str(e)}"
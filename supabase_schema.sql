@@ -33,6 +33,16 @@ CREATE TABLE IF NOT EXISTS course_details (
 -- Indexes for fast course name lookups (optimized for <10ms)
 CREATE INDEX IF NOT EXISTS idx_course_details_course_name ON course_details USING gin (course_name gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_course_details_professor ON course_details USING gin (professor_name gin_trgm_ops);
+-- One row per course: lets upload_courses_to_supabase.py upsert on course_name.
+-- Databases loaded by the old delete-then-insert upload can hold duplicate
+-- course names, which would make the index creation fail, so keep only the
+-- last-written row of each first (a no-op on clean tables; the next upload
+-- rewrites the kept row from the CSV anyway).
+DELETE FROM course_details a
+USING course_details b
+WHERE a.course_name = b.course_name
+  AND a.ctid < b.ctid;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_course_details_course_name_unique ON course_details (course_name);
 
 -- ============================================================================
 -- 2) Course Links Table
@@ -61,6 +71,23 @@ CREATE TABLE IF NOT EXISTS faqs (
 CREATE INDEX IF NOT EXISTS idx_faqs_question_answer ON faqs USING gin (to_tsvector('english', question || ' ' || answer));
 CREATE INDEX IF NOT EXISTS idx_faqs_course_name ON faqs USING gin (course_name gin_trgm_ops);
 
+-- Ranked full-text FAQ search used by SupabaseService.get_faqs (only the top k
+-- rows leave the database); get_faqs falls back to ilike if this isn't created
+ALTER TABLE faqs ADD COLUMN IF NOT EXISTS search_tsv tsvector
+  GENERATED ALWAYS AS (to_tsvector('english', coalesce(question, '') || ' ' || coalesce(answer, ''))) STORED;
+CREATE INDEX IF NOT EXISTS idx_faqs_search_tsv ON faqs USING gin (search_tsv);
+
+CREATE OR REPLACE FUNCTION faqs_search(q TEXT, course TEXT DEFAULT NULL, k INT DEFAULT 5)
+RETURNS TABLE (faq TEXT, course_name TEXT, question TEXT, answer TEXT)
+LANGUAGE sql STABLE PARALLEL SAFE AS $$
+  SELECT f.faq, f.course_name, f.question, f.answer
+  FROM faqs f, websearch_to_tsquery('english', q) AS query
+  WHERE f.search_tsv @@ query
+    AND (course IS NULL OR f.course_name ILIKE '%' || course || '%')
+  ORDER BY ts_rank_cd(f.search_tsv, query) DESC
+  LIMIT k;
+$$;
+
 -- ============================================================================
 -- 4) About Professor Table
 -- ============================================================================
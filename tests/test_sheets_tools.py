@@ -1,4 +1,7 @@
 """Comprehensive tests for Google Sheets tools."""
+import os
+import time
+import threading
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from tools.sheets_tools import create_sheets_tools
@@ -168,3 +171,696 @@ class TestAppendLeadDataSheets:
             tools = create_sheets_tools()
             assert tools == []
 
+
+
+class TestSheetsClientCache:
+    """Tests for the cached worksheet handle."""
+    
+    @pytest.fixture(autouse=True)
+    def sheets_env(self, monkeypatch):
+        """Configure Sheets env vars and reset the worksheet cache."""
+        from tools import sheets_tools
+        monkeypatch.setenv("GOOGLE_SHEETS_CREDENTIALS_PATH", "/tmp/creds.json")
+        monkeypatch.setenv("GOOGLE_SHEETS_SPREADSHEET_ID", "sheet-id")
+        sheets_tools._invalidate_sheets_client()
+        yield
+        sheets_tools._invalidate_sheets_client()
+    
+    @patch('tools.sheets_tools.os.path.exists', return_value=True)
+    @patch('tools.sheets_tools.Credentials')
+    @patch('tools.sheets_tools.gspread')
+    def test_worksheet_reused_between_calls(self, mock_gspread, mock_creds, mock_exists):
+        """Test that the authorized worksheet is only built once."""
+        from tools.sheets_tools import _get_sheets_client
+        
+        first = _get_sheets_client()
+        second = _get_sheets_client()
+        
+        assert first is second
+        mock_gspread.authorize.assert_called_once()
+        mock_creds.from_service_account_file.assert_called_once()
+    
+    @patch('tools.sheets_tools.os.path.exists', return_value=True)
+    @patch('tools.sheets_tools.Credentials')
+    @patch('tools.sheets_tools.gspread')
+    def test_worksheet_reopened_after_expiry(self, mock_gspread, mock_creds, mock_exists):
+        """Test that an expired handle is re-opened from the authorized client."""
+        from tools import sheets_tools
+        
+        sheets_tools._get_sheets_client()
+        sheets_tools._worksheet_cache["expires_at"] = 0.0
+        sheets_tools._get_sheets_client()
+        
+        mock_gspread.authorize.assert_called_once()
+        assert mock_gspread.authorize.return_value.open_by_key.call_count == 2
+    
+    @patch('tools.sheets_tools.os.path.exists', return_value=True)
+    @patch('tools.sheets_tools.Credentials')
+    @patch('tools.sheets_tools.gspread')
+    def test_invalidate_forces_reauthorization(self, mock_gspread, mock_creds, mock_exists):
+        """Test that invalidating the cache re-authorizes on next call."""
+        from tools import sheets_tools
+        
+        sheets_tools._get_sheets_client()
+        sheets_tools._invalidate_sheets_client()
+        sheets_tools._get_sheets_client()
+        
+        assert mock_gspread.authorize.call_count == 2
+
+
+    @patch('tools.sheets_tools.os.path.exists', return_value=True)
+    @patch('tools.sheets_tools.Credentials')
+    @patch('tools.sheets_tools.gspread')
+    def test_concurrent_first_calls_authorize_once(self, mock_gspread, mock_creds, mock_exists):
+        """Test that threads racing on a cold cache share one authorization."""
+        import threading
+        import time
+        from tools.sheets_tools import _get_sheets_client
+        
+        def slow_authorize(creds):
+            time.sleep(0.05)
+            return Mock()
+        mock_gspread.authorize.side_effect = slow_authorize
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(_get_sheets_client())) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        mock_gspread.authorize.assert_called_once()
+        assert all(r is results[0] for r in results)
+
+
+class TestLeadWriteQueue:
+    """Tests for the batched background lead writer."""
+    
+    @pytest.fixture(autouse=True)
+    def empty_queue(self):
+        """Start and end each test with an empty write queue and no sheet snapshot."""
+        from tools import sheets_tools
+        sheets_tools._pending_rows.clear()
+        sheets_tools._invalidate_sheet_values()
+        sheets_tools._flush_failures = 0
+        yield
+        sheets_tools._pending_rows.clear()
+        sheets_tools._invalidate_sheet_values()
+        sheets_tools._flush_failures = 0
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_flush_writes_queued_rows_in_one_call(self, mock_get_client, mock_start):
+        """Test that queued rows are written with a single append_rows call."""
+        from tools.sheets_tools import _enqueue_lead_row, _flush_pending_leads
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        
+        _enqueue_lead_row(["Ali", "CTA"])
+        _enqueue_lead_row(["Sara", "USA Taxation"])
+        _flush_pending_leads()
+        
+        worksheet.append_rows.assert_called_once_with(
+            [["Ali", "CTA"], ["Sara", "USA Taxation"]],
+            value_input_option="RAW",
+            insert_data_option="INSERT_ROWS",
+            table_range="A:I"
+        )
+        worksheet.append_row.assert_not_called()
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_failed_flush_requeues_rows(self, mock_get_client, mock_start):
+        """Test that rows stay queued when the write fails."""
+        from tools import sheets_tools
+        worksheet = Mock()
+        worksheet.append_rows.side_effect = Exception("Sheets down")
+        mock_get_client.return_value = worksheet
+        
+        sheets_tools._enqueue_lead_row(["Ali", "CTA"])
+        with pytest.raises(Exception):
+            sheets_tools._flush_pending_leads()
+        
+        assert sheets_tools._pending_rows == [["Ali", "CTA"]]
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_flush_after_failure_skips_rows_already_written(self, mock_get_client, mock_start):
+        """Test that rows a failed append did write aren't appended a second time."""
+        from tools import sheets_tools
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        sheet_rows = [["Name", "Course", "Education", "Goal", "Phone"]]
+        worksheet.get_all_values.side_effect = lambda: [list(r) for r in sheet_rows]
+        ali = ["Ali", "CTA", "", "", "03001234567", "", "", "", ""]
+        sara = ["Sara", "", "", "", "03111234567", "", "", "", ""]
+        
+        def written_then_failed(rows, **kwargs):
+            sheet_rows.extend(rows)
+            raise Exception("Sheets unavailable")
+        worksheet.append_rows.side_effect = written_then_failed
+        sheets_tools._enqueue_lead_row(ali)
+        with pytest.raises(Exception):
+            sheets_tools._flush_pending_leads()
+        
+        worksheet.append_rows.side_effect = None
+        sheets_tools._enqueue_lead_row(sara)
+        sheets_tools._flush_pending_leads()
+        
+        assert worksheet.append_rows.call_args[0][0] == [sara]
+        assert sheets_tools._pending_rows == []
+        assert sheets_tools._flush_failures == 0
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_flush_after_failure_keeps_rows_queued_when_recheck_fails(self, mock_get_client, mock_start):
+        """Test that a failed sheet read during the duplicate check doesn't re-append every row."""
+        from tools import sheets_tools
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        worksheet.get_all_values.side_effect = Exception("Sheets unavailable")
+        ali = ["Ali", "CTA", "", "", "03001234567", "", "", "", ""]
+        sheets_tools._flush_failures = 1
+        
+        sheets_tools._enqueue_lead_row(ali)
+        with pytest.raises(Exception):
+            sheets_tools._flush_pending_leads()
+        
+        worksheet.append_rows.assert_not_called()
+        assert sheets_tools._pending_rows == [ali]
+        assert sheets_tools._flush_failures == 2
+    
+    def test_retry_delay_backs_off_with_cap(self):
+        """Test that the writer's wait doubles per failed flush up to LEAD_RETRY_MAX_SECONDS."""
+        from tools import sheets_tools
+        delays = []
+        for failures in (0, 1, 2, 20):
+            sheets_tools._flush_failures = failures
+            delays.append(sheets_tools._flush_retry_delay())
+        
+        base = sheets_tools.LEAD_BATCH_WAIT_SECONDS
+        assert delays == [base, base * 2, base * 4, sheets_tools.LEAD_RETRY_MAX_SECONDS]
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_rows_dropped_after_max_failures(self, mock_get_client, mock_start, caplog):
+        """Test that rows are logged and dropped instead of retried forever."""
+        from tools import sheets_tools
+        mock_get_client.side_effect = Exception("Sheets down")
+        sheets_tools._enqueue_lead_row(["Ali", "CTA", "", "", "0300", "", "", "", ""])
+        
+        with caplog.at_level("ERROR", logger="tools.sheets_tools"):
+            for _ in range(sheets_tools.LEAD_FLUSH_MAX_FAILURES):
+                with pytest.raises(Exception):
+                    sheets_tools._flush_pending_leads()
+        
+        assert sheets_tools._pending_rows == []
+        assert sheets_tools._flush_failures == 0
+        assert any("Dropping 1 queued lead row(s)" in r.message for r in caplog.records)
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_full_batch_left_to_writer_while_backing_off(self, mock_get_client, mock_start):
+        """Test that a full batch isn't flushed synchronously while flushes are failing."""
+        from tools import sheets_tools
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        sheets_tools._flush_failures = 1
+        
+        for i in range(sheets_tools.LEAD_BATCH_MAX_ROWS):
+            sheets_tools._enqueue_lead_row([f"Lead {i}"])
+        
+        worksheet.append_rows.assert_not_called()
+        assert len(sheets_tools._pending_rows) == sheets_tools.LEAD_BATCH_MAX_ROWS
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_full_batch_flushes_synchronously(self, mock_get_client, mock_start):
+        """Test that reaching LEAD_BATCH_MAX_ROWS writes the batch immediately."""
+        from tools import sheets_tools
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        
+        for i in range(sheets_tools.LEAD_BATCH_MAX_ROWS - 1):
+            sheets_tools._enqueue_lead_row([f"Lead {i}"])
+        worksheet.append_rows.assert_not_called()
+        
+        sheets_tools._enqueue_lead_row(["Last lead"])
+        
+        worksheet.append_rows.assert_called_once()
+        assert len(worksheet.append_rows.call_args[0][0]) == sheets_tools.LEAD_BATCH_MAX_ROWS
+        assert sheets_tools._pending_rows == []
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_flush_leads_never_raises(self, mock_get_client, mock_start):
+        """Test that the public flush helper swallows write errors."""
+        from tools import sheets_tools
+        mock_get_client.side_effect = Exception("Sheets down")
+        
+        sheets_tools._enqueue_lead_row(["Ali", "CTA"])
+        sheets_tools.flush_leads()
+        
+        assert sheets_tools._pending_rows == [["Ali", "CTA"]]
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_lookup_does_not_flush_queue(self, mock_get_client, mock_start):
+        """Test that a row lookup leaves queued leads batched."""
+        from tools.sheets_tools import _enqueue_lead_row, _find_existing_row
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        worksheet.get_all_values.return_value = [["Name", "Course", "Education", "Goal", "Phone"]]
+        
+        _enqueue_lead_row(["Ali", "CTA", "", "", "0300"])
+        
+        assert _find_existing_row(worksheet, name="ali") == (None, None)
+        worksheet.append_rows.assert_not_called()
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_upsert_merges_into_queued_row(self, mock_get_client, mock_start):
+        """Test that an upsert for a queued lead updates its queued row instead of adding another."""
+        from tools import sheets_tools
+        if not sheets_tools.SHEETS_AVAILABLE:
+            pytest.skip("gspread not installed")
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        worksheet.get_all_values.return_value = [["Name", "Course", "Education", "Goal", "Phone"]]
+        
+        sheets_tools._upsert_lead({"name": "Ali", "phone": "03001234567"})
+        sheets_tools._upsert_lead({"phone": "03001234567", "selected_course": "CTA"})
+        
+        assert len(sheets_tools._pending_rows) == 1
+        assert sheets_tools._pending_rows[0][:5] == ["Ali", "CTA", "", "", "03001234567"]
+        worksheet.append_rows.assert_not_called()
+        worksheet.batch_update.assert_not_called()
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_upsert_after_failed_flush_merges_into_requeued_row(self, mock_get_client, mock_start):
+        """Test that a failed write doesn't lead to a duplicate row for the same lead."""
+        from tools import sheets_tools
+        if not sheets_tools.SHEETS_AVAILABLE:
+            pytest.skip("gspread not installed")
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        worksheet.get_all_values.return_value = [["Name", "Course", "Education", "Goal", "Phone"]]
+        worksheet.append_rows.side_effect = Exception("Sheets down")
+        
+        sheets_tools._upsert_lead({"name": "Ali"})
+        with pytest.raises(Exception):
+            sheets_tools._flush_pending_leads()
+        sheets_tools._upsert_lead({"name": "ali", "goal": "Career switch"})
+        
+        assert len(sheets_tools._pending_rows) == 1
+        assert sheets_tools._pending_rows[0][0] == "Ali"
+        assert sheets_tools._pending_rows[0][3] == "Career switch"
+
+
+class TestBackgroundUpsert:
+    """Tests for lead upserts running on the background worker."""
+    
+    @pytest.fixture(autouse=True)
+    def empty_queue(self):
+        """Start and end each test with an empty write queue."""
+        from tools import sheets_tools
+        sheets_tools._pending_rows.clear()
+        sheets_tools._flush_failures = 0
+        yield
+        sheets_tools._wait_for_upserts()
+        sheets_tools._pending_rows.clear()
+        sheets_tools._flush_failures = 0
+    
+    @patch('tools.sheets_tools._update_row')
+    @patch('tools.sheets_tools._find_existing_row')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_upsert_updates_matching_row(self, mock_get_client, mock_find, mock_update):
+        """Test that a submitted upsert merges into the matched row."""
+        from tools import sheets_tools
+        if not sheets_tools.SHEETS_AVAILABLE:
+            pytest.skip("gspread not installed")
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        mock_find.return_value = (3, ["Ali", "", "", "", "03001234567"])
+        
+        sheets_tools._submit_upsert({"name": "Ali", "selected_course": "CTA"}, add_timestamp=True).result()
+        
+        mock_update.assert_called_once_with(
+            worksheet, 3, {"name": "Ali", "selected_course": "CTA"},
+            add_timestamp=True, existing_row=["Ali", "", "", "", "03001234567"]
+        )
+    
+    @patch('tools.sheets_tools._start_lead_writer')
+    @patch('tools.sheets_tools._find_existing_row', return_value=(None, None))
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_flush_leads_waits_for_upserts(self, mock_get_client, mock_find, mock_start):
+        """Test that flush_leads writes rows queued by still-running upserts."""
+        from tools import sheets_tools
+        if not sheets_tools.SHEETS_AVAILABLE:
+            pytest.skip("gspread not installed")
+        worksheet = Mock()
+        mock_get_client.return_value = worksheet
+        
+        sheets_tools._submit_upsert({"name": "Sara", "selected_course": "CTA"})
+        sheets_tools.flush_leads()
+        
+        rows = worksheet.append_rows.call_args[0][0]
+        assert [row[:2] for row in rows] == [["Sara", "CTA"]]
+        assert rows[0][6:8] == ["Yes", "Demo Shared"]
+    
+    @patch('tools.sheets_tools._flush_pending_leads')
+    @patch('tools.sheets_tools.LEAD_FLUSH_TIMEOUT_SECONDS', 0.1)
+    def test_flush_leads_gives_up_on_hung_upserts(self, mock_flush, caplog):
+        """Test that a hung upsert can't block shutdown: queued ones are cancelled and the flush skipped."""
+        from tools import sheets_tools
+        release = threading.Event()
+        
+        with patch('tools.sheets_tools._upsert_lead', side_effect=lambda *args: release.wait(5)):
+            running = sheets_tools._submit_upsert({"name": "Ali"})
+            queued = sheets_tools._submit_upsert({"name": "Sara"})
+            with caplog.at_level("ERROR", logger="tools.sheets_tools"):
+                started = time.time()
+                sheets_tools.flush_leads()
+                elapsed = time.time() - started
+            release.set()
+            running.result()
+        
+        assert elapsed < 2
+        assert queued.cancelled()
+        mock_flush.assert_not_called()
+        assert any("Abandoned 2 lead upsert(s)" in r.message for r in caplog.records)
+    
+    @patch('tools.sheets_tools._find_existing_row', side_effect=Exception("Sheets down"))
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_failed_upsert_is_logged_not_raised(self, mock_get_client, mock_find):
+        """Test that a failing background upsert doesn't surface as an exception."""
+        from tools.sheets_tools import _submit_upsert
+        
+        assert _submit_upsert({"name": "Ali"}).result() is None
+
+
+def _api_error(status_code):
+    """Build a gspread APIError carrying the given HTTP status."""
+    import gspread
+    response = Mock()
+    response.status_code = status_code
+    response.json.return_value = {"error": {"code": status_code, "message": "error", "status": "ERROR"}}
+    return gspread.exceptions.APIError(response)
+
+
+class TestSheetsRetry:
+    """Tests for backoff on transient Sheets API errors."""
+    
+    @pytest.fixture(autouse=True)
+    def needs_gspread(self):
+        """Skip when gspread isn't installed and load it otherwise."""
+        from tools import sheets_tools
+        if not sheets_tools.SHEETS_AVAILABLE:
+            pytest.skip("gspread not installed")
+        sheets_tools._ensure_gspread()
+    
+    @patch('tools.sheets_tools.time.sleep')
+    def test_retries_quota_errors_with_backoff(self, mock_sleep):
+        """Test that 429s are retried with growing delays until the call succeeds."""
+        from tools.sheets_tools import _values_batch_update
+        worksheet = Mock()
+        worksheet.batch_update.side_effect = [_api_error(429), _api_error(503), None]
+        
+        _values_batch_update(worksheet, [{"range": "B2", "values": [["CTA"]]}])
+        
+        assert worksheet.batch_update.call_count == 3
+        first, second = [c[0][0] for c in mock_sleep.call_args_list]
+        assert 1.0 <= first < 2.0
+        assert 2.0 <= second < 3.0
+    
+    @patch('tools.sheets_tools.time.sleep')
+    def test_gives_up_after_max_attempts(self, mock_sleep):
+        """Test that the last transient error is raised once attempts run out."""
+        import gspread
+        from tools import sheets_tools
+        worksheet = Mock()
+        worksheet.get_all_values.side_effect = _api_error(429)
+        
+        with pytest.raises(gspread.exceptions.APIError):
+            sheets_tools._get_all_values(worksheet)
+        
+        assert worksheet.get_all_values.call_count == sheets_tools.SHEETS_RETRY_MAX_ATTEMPTS
+    
+    @patch('tools.sheets_tools.time.sleep')
+    def test_other_errors_are_not_retried(self, mock_sleep):
+        """Test that non-transient API errors are raised on the first attempt."""
+        import gspread
+        from tools.sheets_tools import _values_append
+        worksheet = Mock()
+        worksheet.append_rows.side_effect = _api_error(400)
+        
+        with pytest.raises(gspread.exceptions.APIError):
+            _values_append(worksheet, [["Ali"]])
+        
+        worksheet.append_rows.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    
+    @patch('tools.sheets_tools.time.sleep')
+    def test_append_is_not_retried_on_503(self, mock_sleep):
+        """Test that a 503 on append is raised at once since the rows may already be written."""
+        import gspread
+        from tools.sheets_tools import _values_append
+        worksheet = Mock()
+        worksheet.append_rows.side_effect = _api_error(503)
+        
+        with pytest.raises(gspread.exceptions.APIError):
+            _values_append(worksheet, [["Ali"]])
+        
+        worksheet.append_rows.assert_called_once()
+        mock_sleep.assert_not_called()
+    
+    @patch('tools.sheets_tools.time.sleep')
+    def test_append_is_retried_on_429(self, mock_sleep):
+        """Test that a quota error on append is retried."""
+        from tools.sheets_tools import _values_append
+        worksheet = Mock()
+        worksheet.append_rows.side_effect = [_api_error(429), None]
+        
+        _values_append(worksheet, [["Ali"]])
+        
+        assert worksheet.append_rows.call_count == 2
+    
+    @patch('tools.sheets_tools._invalidate_sheets_client')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_append_reauthorizes_on_auth_errors(self, mock_get_client, mock_invalidate):
+        """Test that a 401 drops the cached client and retries the append once."""
+        from tools.sheets_tools import _append_rows
+        stale, fresh = Mock(), Mock()
+        stale.append_rows.side_effect = _api_error(401)
+        mock_get_client.side_effect = [stale, fresh]
+        
+        _append_rows([["Ali"]])
+        
+        mock_invalidate.assert_called_once()
+        fresh.append_rows.assert_called_once()
+    
+    @patch('tools.sheets_tools._invalidate_sheets_client')
+    @patch('tools.sheets_tools._get_sheets_client')
+    def test_append_does_not_reauthorize_on_bad_requests(self, mock_get_client, mock_invalidate):
+        """Test that a 400 is raised without re-authorizing or retrying."""
+        import gspread
+        from tools.sheets_tools import _append_rows
+        worksheet = Mock()
+        worksheet.append_rows.side_effect = _api_error(400)
+        mock_get_client.return_value = worksheet
+        
+        with pytest.raises(gspread.exceptions.APIError):
+            _append_rows([["Ali"]])
+        
+        mock_invalidate.assert_not_called()
+        worksheet.append_rows.assert_called_once()
+
+class TestLazyImports:
+    """Tests for deferred Google Sheets library imports."""
+    
+    def test_module_import_does_not_load_gspread(self):
+        """Test that importing the tools module leaves gspread unloaded."""
+        import subprocess
+        import sys
+        code = "import sys, tools.sheets_tools; print('gspread' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        assert result.stdout.strip().splitlines()[-1] == "False"
+    
+    def test_ensure_gspread_imports_on_demand(self):
+        """Test that _ensure_gspread populates the module globals."""
+        from tools import sheets_tools
+        if not sheets_tools.SHEETS_AVAILABLE:
+            pytest.skip("Google Sheets libraries not installed")
+        
+        sheets_tools._ensure_gspread()
+        assert sheets_tools.gspread is not None
+        assert sheets_tools.Credentials is not None
+
+
+class TestUpdateRow:
+    """Tests for _update_row smart merge writes."""
+    
+    def test_changed_cells_written_in_one_batch(self):
+        """Test that all changed cells go out in a single batch_update call."""
+        from tools import sheets_tools
+        if not sheets_tools.SHEETS_AVAILABLE:
+            pytest.skip("Google Sheets libraries not installed")
+        worksheet = Mock()
+        worksheet.row_values.return_value = ["Ali", "", "", "", "0300"]
+        
+        sheets_tools._update_row(worksheet, 2, {
+            "selected_course": "CTA",
+            "education_level": "Bachelors",
+            "notes": "Asked about fee"
+        })
+        
+        worksheet.batch_update.assert_called_once_with(
+            [
+                {"range": "B2:C2", "values": [["CTA", "Bachelors"]]},
+                {"range": "I2", "values": [["Asked about fee"]]}
+            ],
+            value_input_option="USER_ENTERED"
+        )
+        worksheet.update_cell.assert_not_called()
+    
+    def test_existing_row_snapshot_skips_row_fetch(self):
+        """Test that a row passed in from the lookup is not fetched again."""
+        from tools.sheets_tools import _update_row
+        worksheet = Mock()
+        snapshot = ["Ali", "CTA"]
+        
+        _update_row(worksheet, 2, {"name": "Ali", "selected_course": "CTA"}, existing_row=snapshot)
+        
+        worksheet.row_values.assert_not_called()
+        assert snapshot == ["Ali", "CTA"]
+    
+    def test_unchanged_values_not_written(self):
+        """Test that nothing is written when values already match."""
+        from tools.sheets_tools import _update_row
+        worksheet = Mock()
+        worksheet.row_values.return_value = ["Ali", "CTA"]
+        
+        _update_row(worksheet, 2, {"name": "ali", "selected_course": "CTA"})
+        
+        worksheet.batch_update.assert_not_called()
+
+
+class TestSheetValuesCache:
+    """Tests for the short-lived get_all_values() snapshot."""
+    
+    @pytest.fixture(autouse=True)
+    def reset_snapshot(self):
+        """Start and end each test without a cached snapshot."""
+        from tools import sheets_tools
+        sheets_tools._invalidate_sheet_values()
+        yield
+        sheets_tools._invalidate_sheet_values()
+    
+    def test_repeat_lookups_read_sheet_once(self):
+        """Test that back-to-back lookups share one get_all_values() call."""
+        from tools.sheets_tools import _find_existing_row
+        worksheet = Mock()
+        worksheet.get_all_values.return_value = [["Name"], ["Ali"]]
+        
+        _find_existing_row(worksheet, name="Ali")
+        _find_existing_row(worksheet, name="Sara")
+        
+        worksheet.get_all_values.assert_called_once()
+    
+    def test_expired_snapshot_is_refreshed(self):
+        """Test that a stale snapshot triggers a new read."""
+        from tools import sheets_tools
+        worksheet = Mock()
+        worksheet.get_all_values.return_value = [["Name"]]
+        
+        sheets_tools._cached_all_values(worksheet)
+        sheets_tools._sheet_values_cache["expires_at"] = 0.0
+        sheets_tools._cached_all_values(worksheet)
+        
+        assert worksheet.get_all_values.call_count == 2
+    
+    def test_row_update_drops_snapshot(self):
+        """Test that writing to a row invalidates the snapshot."""
+        from tools import sheets_tools
+        if not sheets_tools.SHEETS_AVAILABLE:
+            pytest.skip("Google Sheets libraries not installed")
+        worksheet = Mock()
+        worksheet.get_all_values.return_value = [["Name"], ["Ali"]]
+        
+        sheets_tools._cached_all_values(worksheet)
+        sheets_tools._update_row(worksheet, 2, {"selected_course": "CTA"}, existing_row=["Ali"])
+        sheets_tools._cached_all_values(worksheet)
+        
+        assert worksheet.get_all_values.call_count == 2
+
+
+class TestFindExistingRow:
+    """Tests for name/phone row lookups."""
+    
+    @pytest.fixture(autouse=True)
+    def reset_snapshot(self):
+        """Start and end each test without a cached snapshot."""
+        from tools import sheets_tools
+        sheets_tools._invalidate_sheet_values()
+        yield
+        sheets_tools._invalidate_sheet_values()
+    
+    @pytest.fixture
+    def worksheet(self):
+        """Worksheet with a header and three leads (one duplicate name)."""
+        worksheet = Mock()
+        worksheet.get_all_values.return_value = [
+            ["Name", "Course", "Education", "Goal", "Phone"],
+            ["Ali Khan", "CTA", "", "", "0300-1234567"],
+            ["Sara", "USA Taxation", "", "", "+92 321 7654321"],
+            ["ali khan", "UAE Taxation", "", "", ""]
+        ]
+        return worksheet
+    
+    def test_name_match_is_case_insensitive_and_first_wins(self, worksheet):
+        """Test that names match ignoring case and the first row is returned."""
+        from tools.sheets_tools import _find_existing_row
+        
+        row_num, row = _find_existing_row(worksheet, name="  ALI KHAN ")
+        
+        assert row_num == 2
+        assert row[1] == "CTA"
+    
+    def test_phone_match_ignores_formatting(self, worksheet):
+        """Test that phone numbers match on digits only."""
+        from tools.sheets_tools import _find_existing_row
+        
+        row_num, _ = _find_existing_row(worksheet, phone="+92-321-7654321")
+        
+        assert row_num == 3
+    
+    def test_no_match_returns_none(self, worksheet):
+        """Test that unknown leads return (None, None)."""
+        from tools.sheets_tools import _find_existing_row
+        
+        assert _find_existing_row(worksheet, name="Bilal", phone="0333") == (None, None)
+
+
+class TestNormalization:
+    """Tests for lead name/phone normalization."""
+    
+    def test_phone_keeps_only_digits(self):
+        """Test that spaces, dashes, plus signs and unicode dashes are dropped."""
+        from tools.sheets_tools import _normalize_phone
+        assert _normalize_phone(" +92-300 123–4567 ") == "923001234567"
+    
+    def test_phone_keeps_non_ascii_digits(self):
+        """Test that digits outside ASCII are kept, matching str.isdigit."""
+        from tools.sheets_tools import _normalize_phone
+        assert _normalize_phone("٠٣") == "٠٣"
+    
+    def test_name_ignores_case_and_whitespace(self):
+        """Test that names normalize to stripped lowercase."""
+        from tools.sheets_tools import _normalize_name
+        assert _normalize_name("  Ali KHAN ") == "ali khan"
@@ -0,0 +1,297 @@
+"""Tests for the SupabaseService read cache."""
+import sys
+import os
+
+# Add project root to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set test environment variables before any imports
+os.environ.setdefault("OPENAI_API_KEY", "test-openai-key")
+os.environ.setdefault("API_KEY", "test-api-key")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-supabase-key")
+
+import time
+import threading
+import pytest
+from unittest.mock import Mock, patch
+
+
+class TestReadCache:
+    """Tests for cached SupabaseService reads."""
+
+    @pytest.fixture
+    def mock_supabase_client(self):
+        """Create a mock Supabase client whose queries return one course row."""
+        client = Mock()
+        client.table.return_value = client
+        client.select.return_value = client
+        client.eq.return_value = client
+        client.ilike.return_value = client
+        client.or_.return_value = client
+        client.limit.return_value = client
+        client.rpc.return_value = client
+        client.execute.return_value = Mock(data=[{"course_name": "CTA", "demo_link": "https://demo"}])
+        return client
+
+    @pytest.fixture
+    def supabase_service(self, mock_supabase_client):
+        """Create SupabaseService with mocked client."""
+        with patch('core.supabase_service.create_client') as mock_create:
+            mock_create.return_value = mock_supabase_client
+            from core.supabase_service import SupabaseService
+            service = SupabaseService()
+            service.client = mock_supabase_client
+            return service
+
+    def test_repeated_read_is_served_from_cache(self, supabase_service, mock_supabase_client):
+        """Test that the same query only hits the database once."""
+        first = supabase_service.get_course_links("CTA")
+        second = supabase_service.get_course_links("cta")
+
+        assert first == second == [{"course_name": "CTA", "demo_link": "https://demo"}]
+        assert mock_supabase_client.execute.call_count == 1
+
+    def test_different_arguments_are_cached_separately(self, supabase_service, mock_supabase_client):
+        """Test that distinct queries each go to the database."""
+        supabase_service.get_course_details("CTA")
+        supabase_service.get_course_details("USA Taxation")
+
+        assert mock_supabase_client.execute.call_count == 2
+
+    def test_expired_entry_is_refetched(self, supabase_service, mock_supabase_client):
+        """Test that entries older than the TTL are read again."""
+        from core import supabase_service as service_module
+
+        with patch.object(service_module.time, 'time', return_value=1000.0):
+            supabase_service.get_course_links("CTA")
+        with patch.object(service_module.time, 'time', return_value=1000.0 + service_module.CACHE_TTL_SECONDS):
+            supabase_service.get_course_links("CTA")
+
+        assert mock_supabase_client.execute.call_count == 2
+
+    def test_empty_result_is_cached_briefly(self, supabase_service, mock_supabase_client):
+        """Test that "not found" is cached for NEGATIVE_CACHE_TTL_SECONDS only."""
+        from core import supabase_service as service_module
+        mock_supabase_client.execute.return_value = Mock(data=[])
+
+        with patch.object(service_module.time, 'time', return_value=1000.0):
+            assert supabase_service.get_course_details("CTA Online") == []
+            assert supabase_service.get_course_details("CTA Online") == []
+        assert mock_supabase_client.execute.call_count == 1
+
+        with patch.object(service_module.time, 'time', return_value=1000.0 + service_module.NEGATIVE_CACHE_TTL_SECONDS):
+            supabase_service.get_course_details("CTA Online")
+        assert mock_supabase_client.execute.call_count == 2
+
+    def test_errors_are_not_cached(self, supabase_service, mock_supabase_client):
+        """Test that a failed query is retried on the next call."""
+        mock_supabase_client.execute.side_effect = [
+            Exception("connection reset"),
+            Mock(data=[{"course_name": "CTA"}]),
+        ]
+
+        assert supabase_service.get_course_links("CTA") == []
+        assert supabase_service.get_course_links("CTA") == [{"course_name": "CTA"}]
+
+    def test_clear_cache_by_table(self, supabase_service, mock_supabase_client):
+        """Test that clear_cache(table) only drops that table's entries."""
+        supabase_service.get_course_links("CTA")
+        supabase_service.get_course_details("CTA")
+
+        supabase_service.clear_cache("course_details")
+        supabase_service.get_course_links("CTA")
+        supabase_service.get_course_details("CTA")
+
+        assert mock_supabase_client.execute.call_count == 3
+
+    def test_clear_cache_all(self, supabase_service, mock_supabase_client):
+        """Test that clear_cache() drops every entry."""
+        supabase_service.get_course_links("CTA")
+        supabase_service.get_faqs("fee")
+
+        supabase_service.clear_cache()
+        supabase_service.get_course_links("CTA")
+        supabase_service.get_faqs("fee")
+
+        assert mock_supabase_client.execute.call_count == 4
+
+    def test_least_recently_used_entries_are_evicted(self, supabase_service, mock_supabase_client):
+        """Test that the cache stays within CACHE_MAX_ENTRIES."""
+        with patch('core.supabase_service.CACHE_MAX_ENTRIES', 2):
+            supabase_service.get_course_links("A")
+            supabase_service.get_course_links("B")
+            supabase_service.get_course_links("A")  # hit, A becomes most recent
+            supabase_service.get_course_links("C")  # evicts B
+            supabase_service.get_course_links("A")  # still cached
+            supabase_service.get_course_links("B")  # refetched
+
+        assert mock_supabase_client.execute.call_count == 4
+
+    def test_concurrent_misses_share_one_query(self, supabase_service, mock_supabase_client):
+        """Test that simultaneous callers for the same key cost one database call."""
+        release = threading.Event()
+
+        def slow_execute():
+            release.wait(5)
+            return Mock(data=[{"course_name": "CTA"}])
+
+        mock_supabase_client.execute.side_effect = slow_execute
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(supabase_service.get_course_details("CTA")))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        # Let every thread reach the in-flight query before it completes
+        while len(supabase_service._inflight) == 0:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert results == [[{"course_name": "CTA"}]] * 5
+        assert mock_supabase_client.execute.call_count == 1
+
+    def test_waiters_query_themselves_after_failed_query(self, supabase_service, mock_supabase_client):
+        """Test that a failed in-flight query doesn't hand its error to waiters."""
+        key = ("course_details", "get_course_details", "cta")
+        event = threading.Event()
+        supabase_service._inflight[key] = event
+        event.set()  # the other caller's query finished without caching anything
+
+        assert supabase_service.get_course_details("CTA") == [{"course_name": "CTA", "demo_link": "https://demo"}]
+        assert mock_supabase_client.execute.call_count == 1
+
+    def test_prewarm_fills_cache_for_listed_courses(self, supabase_service, mock_supabase_client):
+        """Test that prewarm caches each listed course so later reads skip the database."""
+        supabase_service.prewarm()
+        calls = mock_supabase_client.execute.call_count
+
+        supabase_service.get_course_links("CTA")
+        supabase_service.get_course_details("CTA")
+        supabase_service.get_company_info()
+        supabase_service.get_faqs(limit=5)
+
+        assert mock_supabase_client.execute.call_count == calls
+
+    def test_faq_search_uses_ranked_database_function(self, supabase_service, mock_supabase_client):
+        """Test that FAQ searches call the ranking function and return its top rows."""
+        from core import supabase_service as service_module
+        supabase_service.get_faqs("refund policy", course_name="CTA", limit=3)
+
+        mock_supabase_client.rpc.assert_called_once_with(
+            service_module.FAQ_SEARCH_FUNCTION, {"q": "refund policy", "course": "CTA", "k": 3}
+        )
+        mock_supabase_client.or_.assert_not_called()
+
+    def test_faq_search_falls_back_when_function_missing(self, supabase_service, mock_supabase_client):
+        """Test that a database without the function falls back to ilike and stops calling it."""
+        missing = Exception("Could not find the function public.faqs_search")
+        missing.code = "PGRST202"
+        mock_supabase_client.execute.side_effect = [missing, Mock(data=[{"question": "Refund?"}]), Mock(data=[])]
+
+        assert supabase_service.get_faqs("refund") == [{"question": "Refund?"}]
+        supabase_service.get_faqs("installments")
+
+        assert mock_supabase_client.rpc.call_count == 1
+        assert mock_supabase_client.or_.call_count == 2
+
+    def test_faq_search_falls_back_when_nothing_ranked(self, supabase_service, mock_supabase_client):
+        """Test that an empty full-text result still tries substring matching."""
+        mock_supabase_client.execute.side_effect = [Mock(data=[]), Mock(data=[{"question": "Fee?"}])]
+
+        assert supabase_service.get_faqs("fee") == [{"question": "Fee?"}]
+        mock_supabase_client.or_.assert_called_once_with("question.ilike.%fee%,answer.ilike.%fee%")
+
+    def test_connection_failure_makes_reads_fail_fast(self, supabase_service, mock_supabase_client):
+        """Test that after Supabase is unreachable, reads skip the database until the window passes."""
+        import httpx
+        from core import supabase_service as service_module
+        from core.supabase_service import SupabaseUnavailableError
+        mock_supabase_client.execute.side_effect = [
+            httpx.ConnectError("connection refused"),
+            Mock(data=[{"course_name": "CTA"}]),
+        ]
+
+        with patch.object(service_module.time, 'time', return_value=1000.0):
+            with pytest.raises(SupabaseUnavailableError):
+                supabase_service.get_course_links("CTA")
+            with pytest.raises(SupabaseUnavailableError):
+                supabase_service.get_course_details("CTA")
+            with pytest.raises(SupabaseUnavailableError):
+                supabase_service.get_faqs("fee")
+        assert mock_supabase_client.execute.call_count == 1
+        assert supabase_service._cache == {}
+
+        with patch.object(service_module.time, 'time', return_value=1000.0 + service_module.CIRCUIT_OPEN_SECONDS):
+            assert supabase_service.get_course_details("CTA") == [{"course_name": "CTA"}]
+        assert mock_supabase_client.execute.call_count == 2
+
+    def test_empty_results_not_cached_while_circuit_open(self, supabase_service):
+        """Test that a "not found" isn't cached once Supabase has been marked unreachable."""
+        key = ("course_details", "get_course_details", "cta")
+        supabase_service._circuit_open_until = float("inf")
+
+        supabase_service._cache_result(key, [])
+
+        assert supabase_service._cache_get(key) is None
+
+    def test_prewarm_stops_when_unreachable(self, supabase_service, mock_supabase_client):
+        """Test that prewarming gives up quietly instead of raising while Supabase is down."""
+        import httpx
+        mock_supabase_client.execute.side_effect = httpx.ConnectError("connection refused")
+
+        supabase_service.prewarm()
+
+        assert mock_supabase_client.execute.call_count == 1
+
+    def test_query_errors_do_not_make_reads_fail_fast(self, supabase_service, mock_supabase_client):
+        """Test that an error answered by the server doesn't mark Supabase unreachable."""
+        mock_supabase_client.execute.side_effect = [Exception("bad filter"), Mock(data=[{"course_name": "CTA"}])]
+
+        assert supabase_service.get_course_links("CTA") == []
+        assert supabase_service.get_course_details("CTA") == [{"course_name": "CTA"}]
+
+    def test_professor_query_selects_only_shown_columns(self, supabase_service, mock_supabase_client):
+        """Test that professor reads don't fetch unused columns like the website bio."""
+        from tools.supabase_tools import _PROF_FIELDS
+        supabase_service.get_professor_info("Rai")
+
+        columns = mock_supabase_client.select.call_args.args[0].split(",")
+        assert columns == [key for key, _ in _PROF_FIELDS]
+
+    def test_repeated_errors_log_one_traceback_per_interval(self, supabase_service, mock_supabase_client, caplog):
+        """Test that an error storm logs every error but only one traceback per interval."""
+        from core import supabase_service as service_module
+        service_module._last_traceback_at.clear()
+        mock_supabase_client.execute.side_effect = Exception("rate limited")
+
+        with caplog.at_level("ERROR", logger="core.supabase_service"):
+            for _ in range(3):
+                supabase_service.search_courses("tax")
+
+        errors = [r for r in caplog.records if r.message.startswith("Error searching courses")]
+        assert len(errors) == 3
+        assert [bool(r.exc_info) for r in errors] == [True, False, False]
+
+
+class TestHttpClient:
+    """Tests for the pooled HTTP client behind the Supabase client."""
+
+    def test_client_uses_pooled_keepalive_http_client(self):
+        """Test that PostgREST requests go through one long-lived httpx client."""
+        from core import supabase_service as service_module
+        with patch('core.supabase_service.create_client') as mock_create, \
+                patch('core.supabase_service.httpx.Client') as mock_http_client:
+            service = service_module.SupabaseService()
+
+        limits = mock_http_client.call_args.kwargs["limits"]
+        assert limits.keepalive_expiry == service_module.HTTP_KEEPALIVE_EXPIRY_SECONDS
+        assert limits.max_keepalive_connections == service_module.HTTP_MAX_KEEPALIVE_CONNECTIONS
+        assert mock_create.call_args.kwargs["options"].httpx_client is mock_http_client.return_value
+
+        service.close()
+        mock_http_client.return_value.close.assert_called_once()
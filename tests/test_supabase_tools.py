@@ -8,6 +8,7 @@ from tools.supabase_tools import create_supabase_tools
 def mock_supabase_service():
     """Create mock Supabase service."""
     service = Mock()
+    service.get_course_names.return_value = ["Certified Tax Advisor - Online", "USA Taxation Course"]
     return service
 
 
@@ -34,15 +35,15 @@ class TestFetchCourseLinks:
         """Test fetching only demo link."""
         mock_supabase_service.get_course_links.return_value = [{
             "demo_link": "https://example.com/demo",
-            "pdf_link": "https://example.com/pdf"
+            "pdf_link": "https://example.com/pdf",
+            "course_link": "https://example.com/course"
         }]
         
         tools = create_supabase_tools(mock_supabase_service)
         fetch_tool = [t for t in tools if t.name == "fetch_course_links"][0]
         
         result = fetch_tool.invoke({"course_name": "CTA", "link_type": "demo"})
-        assert "Demo_Link:" in result
-        assert "Pdf_Link:" not in result
+        assert result == "Demo_Link: https://example.com/demo"
     
     def test_fetch_course_links_pdf_only(self, mock_supabase_service):
         """Test fetching only PDF link."""
@@ -89,6 +90,30 @@ class TestFetchCourseLinks:
         result = fetch_tool.invoke({"course_name": "CTA", "link_type": None})
         assert "Error" in result
 
+    def test_fetch_course_links_database_unavailable(self, mock_supabase_service):
+        """Test that an unreachable database isn't reported as a missing course."""
+        from core.supabase_service import SupabaseUnavailableError
+        from tools.supabase_tools import DATABASE_UNAVAILABLE_MESSAGE
+        mock_supabase_service.get_course_links.side_effect = SupabaseUnavailableError("Supabase unreachable")
+        
+        tools = create_supabase_tools(mock_supabase_service)
+        fetch_tool = [t for t in tools if t.name == "fetch_course_links"][0]
+        
+        result = fetch_tool.invoke({"course_name": "CTA", "link_type": None})
+        assert result == DATABASE_UNAVAILABLE_MESSAGE
+        assert "No course found" not in result
+
+    def test_fetch_course_links_link_type_schema(self, mock_supabase_service):
+        """Test that link_type is case-insensitive and limited to demo/pdf."""
+        from pydantic import ValidationError
+        from tools.supabase_tools import CourseLinksInput
+
+        assert CourseLinksInput(course_name=" CTA ", link_type="PDF").link_type == "pdf"
+        assert CourseLinksInput(course_name=" CTA ").course_name == "CTA"
+        assert CourseLinksInput.model_json_schema()["properties"]["link_type"]["anyOf"][0]["enum"] == ["demo", "pdf"]
+        with pytest.raises(ValidationError):
+            CourseLinksInput(course_name="CTA", link_type="video")
+
 
 class TestFetchCourseDetails:
     """Tests for fetch_course_details tool."""
@@ -109,6 +134,57 @@ class TestFetchCourseDetails:
         assert "course_fee_physical:" in result
         assert "course_duration:" in result
     
+    def test_fetch_course_details_cleans_unicode_and_skips_id(self, mock_supabase_service):
+        """Test that styled Unicode text is flattened to ASCII and id/bookkeeping columns are hidden."""
+        mock_supabase_service.get_course_details.return_value = [{
+            "id": 7,
+            "course_name": "\U0001d402\U0001d413\U0001d400",  # bold "CTA"
+            "course_fee_online": 30000,
+            "created_at": "2025-01-01T00:00:00Z",
+            "course_fee_hibernate": ""
+        }]
+        
+        tools = create_supabase_tools(mock_supabase_service)
+        fetch_tool = [t for t in tools if t.name == "fetch_course_details"][0]
+        
+        result = fetch_tool.invoke({"course_name": "CTA", "field": None})
+        assert result == "course_name: CTA\ncourse_fee_online: 30000"
+    
+    def test_ascii_clean_styled_and_other_unicode(self):
+        """Test that styled letters/digits map to ASCII and other non-ASCII text is still flattened."""
+        from tools.supabase_tools import _ascii_clean
+        
+        # sans-serif bold "Fee", bold digits "25", italic "k"
+        assert _ascii_clean("\U0001d5d9\U0001d5f2\U0001d5f2 \U0001d7d0\U0001d7d3\U0001d458") == "Fee 25k"
+        assert _ascii_clean("Caf\u00e9 \u2013 \U0001d400\u2713") == "Cafe  A"
+        assert _ascii_clean("plain text") == "plain text"
+    
+    def test_fetch_course_details_resolves_aliases(self, mock_supabase_service):
+        """Test that course shorthand is looked up by its exact database name."""
+        mock_supabase_service.get_course_details.return_value = [{"course_name": "USA Taxation Course"}]
+        
+        tools = create_supabase_tools(mock_supabase_service)
+        fetch_tool = [t for t in tools if t.name == "fetch_course_details"][0]
+        
+        fetch_tool.invoke({"course_name": " USA Tax ", "field": None})
+        mock_supabase_service.get_course_details.assert_called_with("USA Taxation Course")
+        
+        # Plain "CTA" is ambiguous (online and city variants) and passes through
+        fetch_tool.invoke({"course_name": "CTA", "field": None})
+        mock_supabase_service.get_course_details.assert_called_with("CTA")
+    
+    def test_fetch_course_details_misspelled_name(self, mock_supabase_service):
+        """Test that a miss is retried with the closest real course name."""
+        mock_supabase_service.get_course_details.side_effect = (
+            lambda name: [{"course_name": name}] if name == "USA Taxation Course" else []
+        )
+        
+        tools = create_supabase_tools(mock_supabase_service)
+        fetch_tool = [t for t in tools if t.name == "fetch_course_details"][0]
+        
+        result = fetch_tool.invoke({"course_name": "USA Taxtion Course", "field": None})
+        assert result == "course_name: USA Taxation Course"
+    
     def test_fetch_course_details_specific_field(self, mock_supabase_service):
         """Test fetching specific field."""
         mock_supabase_service.get_course_details.return_value = [{
@@ -122,7 +198,21 @@ class TestFetchCourseDetails:
         result = fetch_tool.invoke({"course_name": "CTA", "field": "course_fee_physical"})
         assert "course_fee_physical:" in result
         assert "40000" in result
-    
+
+    def test_fetch_course_details_field_by_label(self, mock_supabase_service):
+        """Test that a spaced/capitalised field name finds its column and an empty value is not found."""
+        mock_supabase_service.get_course_details.return_value = [{
+            "course_name": "CTA",
+            "course_duration": "6 months",
+            "course_fee_hibernate": ""
+        }]
+
+        tools = create_supabase_tools(mock_supabase_service)
+        fetch_tool = [t for t in tools if t.name == "fetch_course_details"][0]
+
+        assert fetch_tool.invoke({"course_name": "CTA", "field": "Course Duration"}) == "Course Duration: 6 months"
+        assert "not found" in fetch_tool.invoke({"course_name": "CTA", "field": "course_fee_hibernate"})
+
     def test_fetch_course_details_course_not_found(self, mock_supabase_service):
         """Test error when course not found."""
         mock_supabase_service.get_course_details.return_value = []
@@ -146,6 +236,19 @@ class TestFetchCourseDetails:
         result = fetch_tool.invoke({"course_name": "CTA", "field": "nonexistent_field"})
         assert "Error:" in result
         assert "not found" in result
+
+    def test_fetch_course_details_field_not_found_lists_shown_columns(self, mock_supabase_service):
+        """Test the available-fields hint hides skipped columns and is reused for the same row."""
+        from tools.supabase_tools import _available_course_fields
+        course = {"id": 3, "course_name": "CTA", "course_duration": "6 months"}
+        mock_supabase_service.get_course_details.return_value = [course]
+
+        tools = create_supabase_tools(mock_supabase_service)
+        fetch_tool = [t for t in tools if t.name == "fetch_course_details"][0]
+
+        result = fetch_tool.invoke({"course_name": "CTA", "field": "fee"})
+        assert result == "Error: Field 'fee' not found. Available fields: course_name, course_duration"
+        assert _available_course_fields(course) is _available_course_fields(course)
     
     def test_fetch_course_details_exception_handling(self, mock_supabase_service):
         """Test exception handling."""
@@ -195,6 +298,23 @@ class TestFetchFAQs:
         result = fetch_tool.invoke({"query": "nonexistent", "course_name": None, "top_k": 5})
         assert "No FAQs found" in result
     
+    def test_fetch_faqs_block_format(self, mock_supabase_service):
+        """Test FAQ blocks are numbered and separated by blank lines."""
+        mock_supabase_service.get_faqs.return_value = [
+            {"course_name": "CTA", "question": "Fee?", "answer": "Rs. 40,000"},
+            {},
+            {"question": "Duration?", "answer": "6 months"}
+        ]
+        
+        tools = create_supabase_tools(mock_supabase_service)
+        fetch_tool = [t for t in tools if t.name == "fetch_faqs"][0]
+        
+        result = fetch_tool.invoke({"query": None, "course_name": None, "top_k": 5})
+        assert result == (
+            "FAQ 1:\nCourse: CTA | Question: Fee? | Answer: Rs. 40,000\n\n"
+            "FAQ 3:\nQuestion: Duration? | Answer: 6 months"
+        )
+    
     def test_fetch_faqs_custom_top_k(self, mock_supabase_service):
         """Test fetching with custom top_k."""
         mock_supabase_service.get_faqs.return_value = [
@@ -248,6 +368,23 @@ class TestFetchProfessorInfo:
         result = fetch_tool.invoke({"professor_name": None, "course_name": "CTA"})
         assert "Test Professor" in result
     
+    def test_fetch_professor_info_format(self, mock_supabase_service):
+        """Test the label order and formatting of professor fields."""
+        mock_supabase_service.get_professor_info.return_value = [{
+            "id": 1,
+            "full_name": "Test Professor",
+            "qualifications": "CA",
+            "total_years_of_experience": 12,
+            "certifications": "",
+            "short_bio_for_agent": "Tax expert"
+        }]
+        
+        tools = create_supabase_tools(mock_supabase_service)
+        fetch_tool = [t for t in tools if t.name == "fetch_professor_info"][0]
+        
+        result = fetch_tool.invoke({"professor_name": "Test", "course_name": None})
+        assert result == "Name: Test Professor | Qualifications: CA | Experience: 12 years | Bio: Tax expert"
+    
     def test_fetch_professor_info_not_found(self, mock_supabase_service):
         """Test when professor not found."""
         mock_supabase_service.get_professor_info.return_value = {}
@@ -308,7 +445,21 @@ class TestFetchCompanyInfo:
         
         result = fetch_tool.invoke({"field": "nonexistent"})
         assert "Error:" in result or "not found" in result
-    
+
+    def test_fetch_company_info_reuses_formatting(self, mock_supabase_service):
+        """Test that field lookups use the full company info and formatting is reused."""
+        from tools.supabase_tools import _formatted_company_info
+        info = {"Website URL": "https://ict.example", "Email Address": "info@ict.example", "Fax": ""}
+        mock_supabase_service.get_company_info.return_value = info
+
+        tools = create_supabase_tools(mock_supabase_service)
+        fetch_tool = [t for t in tools if t.name == "fetch_company_info"][0]
+
+        assert fetch_tool.invoke({"field": "Website URL"}) == "Website URL: https://ict.example"
+        mock_supabase_service.get_company_info.assert_called_with()
+        assert fetch_tool.invoke({"field": None}) == "Website URL: https://ict.example\nEmail Address: info@ict.example"
+        assert _formatted_company_info(info)[1] is _formatted_company_info(info)[1]
+
     def test_fetch_company_info_exception_handling(self, mock_supabase_service):
         """Test exception handling."""
         mock_supabase_service.get_company_info.side_effect = Exception("Database error")
@@ -335,6 +486,23 @@ class TestSearchCourses:
         result = search_tool.invoke({"search_term": "tax", "limit": 10})
         assert "CTA" in result
     
+    def test_search_courses_format_and_truncation(self, mock_supabase_service):
+        """Test result numbering, separators and description truncation."""
+        mock_supabase_service.search_courses.return_value = [
+            {"course_name": "CTA", "course_description": "x" * 250},
+            {"course_name": None, "course_description": None},
+            {"course_name": "USA Taxation", "course_description": "US tax"},
+        ]
+        
+        tools = create_supabase_tools(mock_supabase_service)
+        search_tool = [t for t in tools if t.name == "search_courses"][0]
+        
+        result = search_tool.invoke({"search_term": "tax", "limit": 10})
+        assert result == (
+            "1. Course: CTA | Description: " + "x" * 200 + "...\n\n"
+            "3. Course: USA Taxation | Description: US tax"
+        )
+    
     def test_search_courses_no_results(self, mock_supabase_service):
         """Test when no courses found."""
         mock_supabase_service.search_courses.return_value = []
@@ -444,16 +612,85 @@ class TestAppendLeadData:
         })
         assert "error" in result.lower() or "No lead data" in result
     
-    def test_append_lead_data_exception_handling(self, mock_supabase_service):
-        """Test exception handling."""
-        mock_supabase_service.append_lead_data.side_effect = Exception("Database error")
+    def test_append_lead_data_queues_write(self, mock_supabase_service):
+        """Test that the tool returns before writing and the queued write reaches the service."""
+        from tools.supabase_tools import flush_lead_writes
+        mock_supabase_service.append_lead_data.return_value = {
+            "status": "success",
+            "action": "created",
+            "lead_id": "test-id"
+        }
         
         tools = create_supabase_tools(mock_supabase_service)
         append_tool = [t for t in tools if t.name == "append_lead_data"][0]
         
         result = append_tool.invoke({
             "name": "Test",
+            "selected_course": "CTA",
             "add_timestamp": True
         })
-        assert "Error" in result
+        flush_lead_writes()
+        
+        assert "share the demo link" in result
+        mock_supabase_service.append_lead_data.assert_called_once_with(
+            name="Test", phone=None, selected_course="CTA", education_level=None,
+            goal=None, notes=None, add_timestamp=True
+        )
+    
+    def test_append_lead_data_exception_handling(self, mock_supabase_service, caplog):
+        """Test that a failing background write is logged, not raised."""
+        from tools.supabase_tools import flush_lead_writes
+        mock_supabase_service.append_lead_data.side_effect = Exception("Database error")
+        
+        tools = create_supabase_tools(mock_supabase_service)
+        append_tool = [t for t in tools if t.name == "append_lead_data"][0]
+        
+        with caplog.at_level("ERROR", logger="tools.supabase_tools"):
+            result = append_tool.invoke({
+                "name": "Test",
+                "add_timestamp": True
+            })
+            flush_lead_writes()
+        
+        assert "success" in result.lower()
+        assert "Failed to save lead data: Database error" in caplog.text
+
 
+class TestLeadWriteCoalescing:
+    """Tests for merging queued lead writes."""
+    
+    def _payload(self, **fields):
+        payload = {
+            "name": None, "phone": None, "selected_course": None, "education_level": None,
+            "goal": None, "notes": None, "add_timestamp": False
+        }
+        payload.update(fields)
+        return payload
+    
+    def test_writes_for_same_phone_are_merged(self):
+        """Test that later non-empty values win and other leads keep their order."""
+        from tools.supabase_tools import _coalesce_lead_writes
+        service = Mock()
+        batch = [
+            (service, self._payload(phone="0300", selected_course="CTA")),
+            (service, self._payload(name="Sara", goal="Career")),
+            (service, self._payload(phone="0300", notes="Call back", selected_course="", add_timestamp=True)),
+        ]
+        
+        merged = _coalesce_lead_writes(batch)
+        
+        assert [payload for _, payload in merged] == [
+            self._payload(phone="0300", selected_course="CTA", notes="Call back", add_timestamp=True),
+            self._payload(name="Sara", goal="Career"),
+        ]
+    
+    def test_writes_without_name_or_phone_are_not_merged(self):
+        """Test that anonymous writes can't be attributed to one lead and stay separate."""
+        from tools.supabase_tools import _coalesce_lead_writes
+        service = Mock()
+        batch = [
+            (service, self._payload(selected_course="CTA")),
+            (service, self._payload(selected_course="USA Taxation Course")),
+        ]
+        
+        assert len(_coalesce_lead_writes(batch)) == 2
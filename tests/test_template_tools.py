@@ -110,6 +110,18 @@ class TestGetMessageTemplate:
         })
         assert result  # Should return something
 
+    def test_get_template_cached_until_templates_replaced(self, sample_templates):
+        """Test resolved templates are reused and dropped once TEMPLATES is replaced."""
+        with patch('tools.template_tools.TEMPLATES', sample_templates):
+            first = get_message_template.invoke({"template_name": "COURSE_SELECTION", "language": "urdu"})
+            assert first.startswith("[Note: urdu not available, using mixed version]")
+            assert get_message_template.invoke({"template_name": "COURSE_SELECTION", "language": "urdu"}) is first
+
+        reloaded = {"COURSE_SELECTION": {"urdu": "Courses ki list:"}}
+        with patch('tools.template_tools.TEMPLATES', reloaded):
+            result = get_message_template.invoke({"template_name": "COURSE_SELECTION", "language": "urdu"})
+        assert result == "Courses ki list:"
+
 
 class TestListAvailableTemplates:
     """Tests for list_available_templates tool."""
@@ -157,6 +169,18 @@ class TestListAvailableTemplates:
         result = list_available_templates.invoke({})
         assert "Available Message Templates" in result
 
+    def test_list_templates_reused_until_templates_replaced(self, sample_templates):
+        """Test the listing is built once per templates dict and rebuilt after a reload."""
+        with patch('tools.template_tools.TEMPLATES', sample_templates):
+            first = list_available_templates.invoke({})
+            assert list_available_templates.invoke({}) is first
+
+        reloaded = {"NEW_TEMPLATE": {"english": "Hi", "description": "Added later"}}
+        with patch('tools.template_tools.TEMPLATES', reloaded):
+            result = list_available_templates.invoke({})
+        assert "NEW_TEMPLATE" in result
+        assert "GREETING_NEW_LEAD" not in result
+
 
 class TestReloadTemplates:
     """Tests for reload_templates function."""
@@ -1,21 +1,52 @@
-"""Google Sheets tools for LangChain agents - appending lead data."""
+"""Google Sheets tools for LangChain agents - appending lead data.
+
+The default agent doesn't register these tools (it saves leads to Supabase);
+they are for deployments that add create_sheets_tools() to the agent's tools.
+The lead write queue, its writer thread, the upsert worker and the exit hook
+are only started once the tools are created and used, so importing this
+module (as app.py does for flush_leads) costs nothing otherwise.
+"""
 import os
+import time
+import random
+import functools
+import atexit
 import logging
-from typing import List, Optional
-from datetime import datetime
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
 
-try:
-    import gspread
-    from google.oauth2.service_account import Credentials
-    SHEETS_AVAILABLE = True
-except ImportError:
-    SHEETS_AVAILABLE = False
+# gspread and google-auth pull in httplib2 and the Google API client stack, so
+# only check that they are installed here and import them on first use.
+def _module_installed(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ImportError:
+        return False
+
+
+SHEETS_AVAILABLE = _module_installed("gspread") and _module_installed("google.oauth2.service_account")
+if not SHEETS_AVAILABLE:
     logger.warning("Google Sheets libraries not installed. Install with: pip install gspread google-auth")
 
+gspread = None
+Credentials = None
+
+
+def _ensure_gspread():
+    """Import gspread and google-auth the first time they are needed."""
+    global gspread, Credentials
+    if gspread is None:
+        import gspread as _gspread
+        from google.oauth2.service_account import Credentials as _Credentials
+        gspread = _gspread
+        Credentials = _Credentials
+
 
 class AppendLeadDataInput(BaseModel):
     """Input schema for appending/updating lead data to Google Sheets.
@@ -34,39 +65,459 @@ class AppendLeadDataInput(BaseModel):
     add_timestamp: Optional[bool] = Field(default=False, description="If True, add current timestamp to the row")
 
 
+# Timestamp format written to the Timestamp column
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Sheets answers 429 (per-minute quota exceeded) and 503 (backend unavailable)
+# for conditions that clear within seconds, so those calls are retried with
+# exponential backoff plus jitter instead of failing the lead save.
+SHEETS_RETRY_STATUS_CODES = (429, 503)
+SHEETS_APPEND_RETRY_STATUS_CODES = (429,)
+SHEETS_RETRY_MAX_ATTEMPTS = 5
+SHEETS_RETRY_BASE_SECONDS = 1.0
+SHEETS_AUTH_STATUS_CODES = (401, 403)
+
+
+def _is_transient_api_error(e: Exception, status_codes: tuple = SHEETS_RETRY_STATUS_CODES) -> bool:
+    """True for gspread APIErrors with a retryable HTTP status (429/503 by default)."""
+    if gspread is None or not isinstance(e, gspread.exceptions.APIError):
+        return False
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return status in status_codes
+
+
+def _is_auth_api_error(e: Exception) -> bool:
+    """True for gspread APIErrors caused by an expired or rejected session (401/403)."""
+    if gspread is None or not isinstance(e, gspread.exceptions.APIError):
+        return False
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return status in SHEETS_AUTH_STATUS_CODES
+
+
+def _retry_on_sheets_error(
+    max_attempts: int = SHEETS_RETRY_MAX_ATTEMPTS,
+    base: float = SHEETS_RETRY_BASE_SECONDS,
+    status_codes: tuple = SHEETS_RETRY_STATUS_CODES
+):
+    """Retry the decorated Sheets API call on status_codes, sleeping base * 2**attempt + jitter."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == max_attempts - 1 or not _is_transient_api_error(e, status_codes):
+                        raise
+                    delay = base * 2 ** attempt + random.random()
+                    logger.warning(
+                        "Sheets API error in %s (%s), retrying in %.1fs (attempt %s/%s)",
+                        func.__name__, e, delay, attempt + 1, max_attempts
+                    )
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
+
+# Authorized gspread client and worksheet handle, reused across tool calls.
+# Authorizing costs a credentials file read and an OAuth exchange, so the client
+# is kept until invalidated (gspread refreshes its token itself). The worksheet
+# handle is re-opened from that client once it is older than the TTL.
+WORKSHEET_CACHE_TTL_SECONDS = 1800
+# gspread requests have no timeout by default; a hung call would hold the
+# upsert worker (and the write lock) forever
+SHEETS_REQUEST_TIMEOUT_SECONDS = 30
+_worksheet_cache = {"client": None, "worksheet": None, "expires_at": 0.0}
+_worksheet_lock = threading.Lock()
+
+
+def _invalidate_sheets_client():
+    """Drop the cached client and worksheet so the next call re-authorizes."""
+    with _worksheet_lock:
+        _worksheet_cache["client"] = None
+        _worksheet_cache["worksheet"] = None
+        _worksheet_cache["expires_at"] = 0.0
+
+
+def _cached_worksheet():
+    """Return the cached worksheet if it hasn't expired, else None."""
+    worksheet = _worksheet_cache["worksheet"]
+    if worksheet is not None and time.time() < _worksheet_cache["expires_at"]:
+        return worksheet
+    return None
+
+
 def _get_sheets_client():
-    """Get authenticated Google Sheets client."""
+    """Get authenticated Google Sheets worksheet (cached for WORKSHEET_CACHE_TTL_SECONDS)."""
+    worksheet = _cached_worksheet()
+    if worksheet is not None:
+        return worksheet
+    
     if not SHEETS_AVAILABLE:
         raise ImportError("Google Sheets libraries not installed. Install with: pip install gspread google-auth")
+    _ensure_gspread()
     
-    credentials_path = os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH")
-    if not credentials_path:
-        raise ValueError("GOOGLE_SHEETS_CREDENTIALS_PATH environment variable not set")
+    with _worksheet_lock:
+        # Another thread may have rebuilt the handle while we waited for the lock
+        worksheet = _cached_worksheet()
+        if worksheet is not None:
+            return worksheet
+        
+        credentials_path = os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH")
+        if not credentials_path:
+            raise ValueError("GOOGLE_SHEETS_CREDENTIALS_PATH environment variable not set")
+        
+        if not os.path.exists(credentials_path):
+            raise FileNotFoundError(f"Credentials file not found: {credentials_path}")
+        
+        spreadsheet_id = os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID")
+        if not spreadsheet_id:
+            raise ValueError("GOOGLE_SHEETS_SPREADSHEET_ID environment variable not set")
+        
+        sheet_name = os.getenv("GOOGLE_SHEETS_LEADS_SHEET_NAME", "Leads")
+        
+        try:
+            client = _worksheet_cache["client"]
+            if client is None:
+                creds = Credentials.from_service_account_file(
+                    credentials_path,
+                    scopes=['https://www.googleapis.com/auth/spreadsheets']
+                )
+                client = gspread.authorize(creds)
+                client.set_timeout(SHEETS_REQUEST_TIMEOUT_SECONDS)
+            spreadsheet = client.open_by_key(spreadsheet_id)
+            worksheet = spreadsheet.worksheet(sheet_name)
+            _worksheet_cache["client"] = client
+            _worksheet_cache["worksheet"] = worksheet
+            _worksheet_cache["expires_at"] = time.time() + WORKSHEET_CACHE_TTL_SECONDS
+            return worksheet
+        except Exception as e:
+            logger.error(f"Error initializing Google Sheets client: {e}", exc_info=True)
+            raise
+
+
+# Snapshot of the whole sheet from the last get_all_values(), reused by row
+# lookups for a short time. It is dropped after every write we make, so a
+# lookup never misses a row this process just wrote.
+SHEET_VALUES_CACHE_TTL_SECONDS = 30
+_sheet_values_cache = {"worksheet": None, "values": None, "index": None, "expires_at": 0.0}
+
+# Expected columns: Name, Course, Education, Goal, Phone, Timestamp, Demo_Link_Sent, Status, Notes
+NAME_COL_IDX = 0  # Column A (Name)
+PHONE_COL_IDX = 4  # Column E (Phone)
+LEAD_TABLE_RANGE = "A:I"
+LEAD_COLUMN_COUNT = 9  # Name .. Notes
+
+
+def _invalidate_sheet_values():
+    """Drop the cached sheet snapshot so the next lookup re-reads the sheet."""
+    _sheet_values_cache["worksheet"] = None
+    _sheet_values_cache["values"] = None
+    _sheet_values_cache["index"] = None
+    _sheet_values_cache["expires_at"] = 0.0
+
+
+class _DigitsOnlyTable(dict):
+    """str.translate table that keeps digits and deletes everything else.
     
-    if not os.path.exists(credentials_path):
-        raise FileNotFoundError(f"Credentials file not found: {credentials_path}")
+    Entries are filled in on first sight of a code point, so any Unicode
+    character is handled while the common ASCII ones stay a plain dict hit.
+    """
+    def __missing__(self, codepoint: int):
+        value = codepoint if chr(codepoint).isdigit() else None
+        self[codepoint] = value
+        return value
+
+
+_DIGITS_ONLY = _DigitsOnlyTable()
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_phone(phone: str) -> str:
+    """Keep only the digits of a phone number (drops spaces, dashes, +, etc.)."""
+    return phone.translate(_DIGITS_ONLY)
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_name(name: str) -> str:
+    """Case- and whitespace-insensitive form of a lead name."""
+    return name.strip().lower()
+
+
+def _build_row_index(all_values: List[List[str]]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Build name -> row and phone -> row lookups over a sheet snapshot.
     
-    spreadsheet_id = os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID")
-    if not spreadsheet_id:
-        raise ValueError("GOOGLE_SHEETS_SPREADSHEET_ID environment variable not set")
+    First row is the header, data starts from row 2. Only the first row for a
+    given name/phone is kept so lookups match a top-down scan.
     
-    sheet_name = os.getenv("GOOGLE_SHEETS_LEADS_SHEET_NAME", "Leads")
+    Returns:
+        Tuple of (lowercased name -> row number, digits-only phone -> row number)
+    """
+    name_to_row = {}
+    phone_to_row = {}
+    for idx, row in enumerate(all_values[1:], start=2):
+        row_name = _normalize_name(row[NAME_COL_IDX]) if len(row) > NAME_COL_IDX else ""
+        if row_name:
+            name_to_row.setdefault(row_name, idx)
+        row_phone = _normalize_phone(row[PHONE_COL_IDX]) if len(row) > PHONE_COL_IDX else ""
+        if row_phone:
+            phone_to_row.setdefault(row_phone, idx)
+    return name_to_row, phone_to_row
+
+
+def _cached_sheet_index(worksheet) -> Tuple[List[List[str]], Dict[str, int], Dict[str, int]]:
+    """Return (all_values, name_to_row, phone_to_row) for the cached snapshot.
     
+    The lookups are built once per snapshot and reused until it is refreshed.
+    """
+    all_values = _cached_all_values(worksheet)
+    index = _sheet_values_cache["index"]
+    if index is None or index[0] is not all_values:
+        index = (all_values, *_build_row_index(all_values))
+        _sheet_values_cache["index"] = index
+    return index
+
+
+def _cached_all_values(worksheet, ttl: float = SHEET_VALUES_CACHE_TTL_SECONDS) -> List[List[str]]:
+    """Return worksheet.get_all_values(), served from cache for up to ttl seconds."""
+    if (
+        _sheet_values_cache["worksheet"] is worksheet
+        and time.time() < _sheet_values_cache["expires_at"]
+    ):
+        return _sheet_values_cache["values"]
+    
+    all_values = _get_all_values(worksheet)
+    _sheet_values_cache["worksheet"] = worksheet
+    _sheet_values_cache["values"] = all_values
+    _sheet_values_cache["expires_at"] = time.time() + ttl
+    return all_values
+
+
+@_retry_on_sheets_error()
+def _get_all_values(worksheet) -> List[List[str]]:
+    """Read the whole sheet (one spreadsheets.values.get call)."""
+    return worksheet.get_all_values()
+
+
+# New lead rows are queued and written in batches, one append_rows call per
+# batch instead of one append_row RPC per lead. A background thread flushes
+# LEAD_BATCH_WAIT_SECONDS after the first queued row; once LEAD_BATCH_MAX_ROWS
+# rows are waiting, the caller that queued the last one flushes synchronously.
+# Upserts for a lead that is still queued are merged into its queued row, so
+# lookups never need to flush first. _write_lock is held while a batch is being
+# written and while an upsert decides between update, merge and new row, so a
+# lead is always either in the queue or in the sheet when it is looked up.
+# After a failed flush the writer backs off (doubling up to
+# LEAD_RETRY_MAX_SECONDS); after LEAD_FLUSH_MAX_FAILURES failures in a row the
+# queued rows are logged and dropped rather than retried forever.
+LEAD_BATCH_MAX_ROWS = 20
+LEAD_BATCH_WAIT_SECONDS = 2.0
+LEAD_RETRY_MAX_SECONDS = 300.0
+LEAD_FLUSH_MAX_FAILURES = 10
+_pending_rows: List[list] = []
+_pending_cond = threading.Condition()
+_write_lock = threading.RLock()
+_flush_failures = 0  # consecutive failed flushes
+_writer_thread: Optional[threading.Thread] = None
+
+
+def _append_rows(rows: List[list]):
+    """Append rows to the sheet in one request, re-authorizing once on 401/403."""
+    _ensure_gspread()
+    worksheet = _get_sheets_client()
     try:
-        creds = Credentials.from_service_account_file(
-            credentials_path,
-            scopes=['https://www.googleapis.com/auth/spreadsheets']
-        )
-        client = gspread.authorize(creds)
-        spreadsheet = client.open_by_key(spreadsheet_id)
-        worksheet = spreadsheet.worksheet(sheet_name)
-        return worksheet
+        _values_append(worksheet, rows)
+    except gspread.exceptions.APIError as e:
+        if not _is_auth_api_error(e):
+            raise
+        # Cached handle holds a stale session - re-authorize once and retry
+        _invalidate_sheets_client()
+        worksheet = _get_sheets_client()
+        _values_append(worksheet, rows)
+
+
+@_retry_on_sheets_error(status_codes=SHEETS_APPEND_RETRY_STATUS_CODES)
+def _values_append(worksheet, rows: List[list]):
+    """Single spreadsheets.values.append call for the lead columns.
+    
+    INSERT_ROWS makes the API insert fresh rows below the table instead of
+    writing over whatever follows it, and the fixed A:I range skips table
+    detection across the rest of the sheet. Appends aren't idempotent, so only
+    429s (rejected before anything is written) are retried; a 503 may already
+    have added the rows.
+    """
+    worksheet.append_rows(
+        rows,
+        value_input_option="RAW",
+        insert_data_option="INSERT_ROWS",
+        table_range=LEAD_TABLE_RANGE
+    )
+
+
+def _rows_missing_from_sheet(rows: List[list]) -> List[list]:
+    """Drop queued rows whose lead (by name or phone) is already in the sheet.
+    
+    A failed sheet read raises rather than counting every row as missing, so
+    the caller keeps the rows queued instead of appending them a second time.
+    """
+    _invalidate_sheet_values()
+    worksheet = _get_sheets_client()
+    missing = []
+    for row in rows:
+        row_num, _ = _lookup_row(worksheet, name=row[NAME_COL_IDX] or None, phone=row[PHONE_COL_IDX] or None)
+        if row_num is None:
+            missing.append(row)
+    if len(missing) < len(rows):
+        logger.info("Skipped %s queued lead row(s) already written by a failed flush", len(rows) - len(missing))
+    return missing
+
+
+def _flush_pending_leads():
+    """Write all queued lead rows to the sheet now.
+    
+    Called by the background writer, when a batch is full and on shutdown.
+    Rows are put back in the queue if the write fails (and dropped after
+    LEAD_FLUSH_MAX_FAILURES failures in a row); since a failed append may
+    still have landed, the next flush skips rows already in the sheet.
+    """
+    global _flush_failures
+    with _write_lock:
+        with _pending_cond:
+            rows = _pending_rows[:]
+            _pending_rows.clear()
+        if not rows:
+            return
+        try:
+            if _flush_failures:
+                rows = _rows_missing_from_sheet(rows)
+            if rows:
+                _append_rows(rows)
+                _invalidate_sheet_values()
+                logger.info(f"Flushed {len(rows)} queued lead row(s) to Google Sheets")
+            _flush_failures = 0
+        except Exception:
+            _flush_failures += 1
+            if _flush_failures >= LEAD_FLUSH_MAX_FAILURES:
+                logger.error(
+                    "Dropping %s queued lead row(s) after %s failed flushes to Google Sheets: %r",
+                    len(rows), _flush_failures, rows
+                )
+                _flush_failures = 0
+            else:
+                with _pending_cond:
+                    _pending_rows[:0] = rows
+            raise
+
+
+def _flush_retry_delay() -> float:
+    """Seconds the writer waits before its next flush: doubles per failure, capped."""
+    return min(LEAD_BATCH_WAIT_SECONDS * 2 ** _flush_failures, LEAD_RETRY_MAX_SECONDS)
+
+
+def _lead_writer_loop():
+    """Background loop: wait for queued rows, give the batch a moment to fill, flush.
+    
+    While flushes keep failing, only the first failure logs a traceback.
+    """
+    while True:
+        with _pending_cond:
+            _pending_cond.wait_for(lambda: _pending_rows)
+        time.sleep(_flush_retry_delay())
+        try:
+            _flush_pending_leads()
+        except Exception as e:
+            if _flush_failures == 1:
+                logger.error(f"Error flushing queued lead rows to Google Sheets: {e}", exc_info=True)
+            elif _flush_failures:
+                logger.warning(
+                    "Flushing queued lead rows failed again (%s in a row), retrying in %.0fs: %s",
+                    _flush_failures, _flush_retry_delay(), e
+                )
+
+
+def _start_lead_writer():
+    """Start the background writer thread once."""
+    global _writer_thread
+    with _pending_cond:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_lead_writer_loop, name="sheets-lead-writer", daemon=True)
+            _writer_thread.start()
+
+
+def _enqueue_lead_row(row_data: list):
+    """Queue a new lead row, flushing the batch right away once it is full."""
+    with _pending_cond:
+        _pending_rows.append(row_data)
+        batch_full = len(_pending_rows) >= LEAD_BATCH_MAX_ROWS
+        _pending_cond.notify()
+    _start_lead_writer()
+    
+    # While the writer is backing off after failures, leave the retry to it
+    if batch_full and not _flush_failures:
+        try:
+            _flush_pending_leads()
+        except Exception as e:
+            # Rows stay queued; the background writer retries them
+            logger.error("Error flushing full lead batch to Google Sheets: %s", e)
+
+
+def _find_pending_row(name: Optional[str] = None, phone: Optional[str] = None) -> Optional[list]:
+    """Return the queued (not yet written) row for this lead, matched by name then phone."""
+    normalized_name = _normalize_name(name) if name else ""
+    normalized_phone = _normalize_phone(phone) if phone else ""
+    with _pending_cond:
+        if normalized_name:
+            for row in _pending_rows:
+                if _normalize_name(row[NAME_COL_IDX]) == normalized_name:
+                    return row
+        if normalized_phone:
+            for row in _pending_rows:
+                if _normalize_phone(row[PHONE_COL_IDX]) == normalized_phone:
+                    return row
+    return None
+
+
+_exit_flush_registered = False
+
+
+def _register_exit_flush():
+    """Flush leads at interpreter exit; registered once, when the tools are created."""
+    global _exit_flush_registered
+    with _upsert_lock:
+        if not _exit_flush_registered:
+            atexit.register(flush_leads)
+            _exit_flush_registered = True
+
+
+def flush_leads():
+    """Finish submitted lead upserts and write any queued lead rows to Google Sheets now.
+    
+    Safe to call at any time (e.g. on application shutdown); never raises.
+    Waits at most LEAD_FLUSH_TIMEOUT_SECONDS for submitted upserts: ones that
+    haven't started are cancelled, and if one is still running (holding the
+    write lock) the queued rows are left unwritten rather than blocking shutdown.
+    """
+    try:
+        unfinished = _wait_for_upserts(timeout=LEAD_FLUSH_TIMEOUT_SECONDS)
+        if unfinished:
+            not_started = sum(future.cancel() for future in unfinished)
+            running = len(unfinished) - not_started
+            logger.error(
+                "Abandoned %s lead upsert(s) after %ss (%s not started, %s still running)",
+                len(unfinished), LEAD_FLUSH_TIMEOUT_SECONDS, not_started, running
+            )
+            if running:
+                logger.error("Skipped flushing %s queued lead row(s) to Google Sheets", len(_pending_rows))
+                return
+        _flush_pending_leads()
     except Exception as e:
-        logger.error(f"Error initializing Google Sheets client: {e}", exc_info=True)
-        raise
+        logger.error(f"Error flushing queued lead rows: {e}")
+
 
 
-def _find_existing_row(worksheet, name: Optional[str] = None, phone: Optional[str] = None) -> Optional[int]:
+def _find_existing_row(
+    worksheet, name: Optional[str] = None, phone: Optional[str] = None
+) -> Tuple[Optional[int], Optional[List[str]]]:
     """Find existing row by name or phone number.
     
     Args:
@@ -75,44 +526,160 @@ def _find_existing_row(worksheet, name: Optional[str] = None, phone: Optional[st
         phone: Phone number to search for
     
     Returns:
-        Row number (1-indexed) if found, None otherwise
+        Tuple of (row number (1-indexed), row values) if found, (None, None) otherwise.
+        The row values come from the same sheet read, so callers can merge into
+        them without fetching the row again.
     """
     try:
-        # Get all values from the sheet
-        all_values = worksheet.get_all_values()
-        
-        if not all_values:
-            return None
-        
-        # Assume first row is header, data starts from row 2
-        # Expected columns: Name, Course, Education, Goal, Phone, Timestamp, Demo_Link_Sent, Status, Notes
-        # Adjust column indices based on your actual sheet structure
-        name_col_idx = 0  # Column A (Name)
-        phone_col_idx = 4  # Column E (Phone)
-        
-        for idx, row in enumerate(all_values[1:], start=2):  # Start from row 2 (skip header)
-            row_name = row[name_col_idx].strip() if len(row) > name_col_idx else ""
-            row_phone = row[phone_col_idx].strip() if len(row) > phone_col_idx else ""
+        return _lookup_row(worksheet, name=name, phone=phone)
+    except Exception as e:
+        logger.error("Error finding existing row: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
+        return None, None
+
+
+def _lookup_row(
+    worksheet, name: Optional[str] = None, phone: Optional[str] = None
+) -> Tuple[Optional[int], Optional[List[str]]]:
+    """Same as _find_existing_row, but a failed sheet read raises instead of reading as a miss."""
+    # Name/phone -> row dicts built over the cached snapshot
+    all_values, name_to_row, phone_to_row = _cached_sheet_index(worksheet)
+    
+    if not all_values:
+        return None, None
+    
+    matches = []
+    # Match on name (case-insensitive, ignore whitespace)
+    normalized_name = _normalize_name(name) if name else ""
+    if normalized_name:
+        matches.append(name_to_row.get(normalized_name))
+    # Match on phone (exact match, ignore whitespace and formatting)
+    if phone:
+        normalized_phone = _normalize_phone(phone)
+        if normalized_phone:
+            matches.append(phone_to_row.get(normalized_phone))
+    
+    matches = [idx for idx in matches if idx is not None]
+    if not matches:
+        return None, None
+    
+    # Earliest matching row wins, same as a top-down scan
+    idx = min(matches)
+    return idx, all_values[idx - 1]
+
+
+def _coalesce_row_updates(row_num: int, updates: dict) -> List[dict]:
+    """Turn {col_idx: value} updates for one row into batch_update ranges.
+    
+    Adjacent columns are merged into a single range, e.g. columns B, C, D
+    become one "B2:D2" entry.
+    
+    Args:
+        row_num: Row number (1-indexed)
+        updates: Mapping of 0-indexed column to new value
+    
+    Returns:
+        List of {"range", "values"} dicts for worksheet.batch_update
+    """
+    _ensure_gspread()
+    body = []
+    run_start = None
+    run_values = []
+    for col_idx in sorted(updates):
+        if run_values and col_idx == run_start + len(run_values):
+            run_values.append(updates[col_idx])
+            continue
+        if run_values:
+            body.append(_row_range(row_num, run_start, run_values))
+        run_start = col_idx
+        run_values = [updates[col_idx]]
+    if run_values:
+        body.append(_row_range(row_num, run_start, run_values))
+    return body
+
+
+def _row_range(row_num: int, start_col_idx: int, values: list) -> dict:
+    """Build one batch_update entry for consecutive cells in a row (gspread uses 1-indexed)."""
+    start = gspread.utils.rowcol_to_a1(row_num, start_col_idx + 1)
+    if len(values) == 1:
+        cell_range = start
+    else:
+        cell_range = f"{start}:{gspread.utils.rowcol_to_a1(row_num, start_col_idx + len(values))}"
+    return {"range": cell_range, "values": [values]}
+
+
+@_retry_on_sheets_error()
+def _values_batch_update(worksheet, data: List[dict]):
+    """Single spreadsheets.values.batchUpdate call for the changed cells of a row."""
+    worksheet.batch_update(data, value_input_option="USER_ENTERED")
+
+
+# Lead field -> 0-indexed column. Expected column order: Name, Course,
+# Education, Goal, Phone, Timestamp, Demo_Link_Sent, Status, Notes
+LEAD_COLUMNS = {
+    'name': 0,
+    'selected_course': 1,
+    'education_level': 2,
+    'goal': 3,
+    'phone': 4,
+    'timestamp': 5,
+    'demo_link_sent': 6,
+    'conversation_status': 7,
+    'notes': 8
+}
+
+
+def _merged_updates(existing_row: List[str], new_data: dict, add_timestamp: bool = False) -> dict:
+    """Work out which cells of a lead row change when new_data is merged into it.
+    
+    Smart merge logic:
+    - Only updates fields that are empty in existing row (fills gaps)
+    - Only updates fields with new non-empty values (doesn't overwrite with empty)
+    - Preserves existing data when new data is not provided
+    
+    Args:
+        existing_row: Current row values, padded to LEAD_COLUMN_COUNT
+        new_data: Dictionary with field names and new values (only provided fields)
+        add_timestamp: If True, add/update current timestamp
+    
+    Returns:
+        Mapping of 0-indexed column to new value
+    """
+    # Prepare update values (only update when appropriate)
+    updates = {}
+    for field, value in new_data.items():
+        # Skip None or empty values - don't overwrite existing data with empty
+        if value is None or value == "":
+            continue
             
-            # Match on name (case-insensitive, ignore whitespace)
-            if name and row_name and name.strip().lower() == row_name.lower():
-                return idx
+        col_idx = LEAD_COLUMNS.get(field)
+        if col_idx is not None:
+            existing_value = existing_row[col_idx].strip()
             
-            # Match on phone (exact match, ignore whitespace and formatting)
-            if phone and row_phone:
-                # Normalize phone numbers (remove spaces, dashes, etc.)
-                normalized_phone = ''.join(filter(str.isdigit, phone.strip()))
-                normalized_row_phone = ''.join(filter(str.isdigit, row_phone))
-                if normalized_phone and normalized_phone == normalized_row_phone:
-                    return idx
-        
-        return None
-    except Exception as e:
-        logger.error(f"Error finding existing row: {e}", exc_info=True)
-        return None
+            # Smart merge: Only update if:
+            # 1. Field is empty in existing row (fill the gap)
+            # 2. New value is different from existing (update with new data)
+            # Never overwrite existing data with empty values
+            if existing_value == "" or existing_value == "None" or existing_value.lower() == "none":
+                # Fill empty field
+                updates[col_idx] = value
+            elif existing_value.lower() != value.lower():
+                # Update with new value (new data takes precedence)
+                updates[col_idx] = value
+            # Otherwise values are the same, skip update
+    
+    # Add/update timestamp if requested (always update timestamp when requested)
+    if add_timestamp:
+        updates[LEAD_COLUMNS['timestamp']] = time.strftime(TIMESTAMP_FORMAT)
+    return updates
 
 
-def _update_row(worksheet, row_num: int, new_data: dict, add_timestamp: bool = False):
+def _update_row(
+    worksheet,
+    row_num: int,
+    new_data: dict,
+    add_timestamp: bool = False,
+    existing_row: Optional[List[str]] = None
+):
     """Update existing row with new data, merging intelligently with existing values.
     
     Smart merge logic:
@@ -125,76 +692,157 @@ def _update_row(worksheet, row_num: int, new_data: dict, add_timestamp: bool = F
         row_num: Row number to update (1-indexed)
         new_data: Dictionary with field names and new values (only provided fields)
         add_timestamp: If True, add/update current timestamp
+        existing_row: Current row values if already fetched (skips the row_values request)
     """
     try:
-        # Get existing row data
-        existing_row = worksheet.row_values(row_num)
+        # Get existing row data (reuse the snapshot from _find_existing_row when given)
+        if existing_row is not None:
+            existing_row = list(existing_row)
+        else:
+            existing_row = worksheet.row_values(row_num)
         
-        # Expected column order: Name, Course, Education, Goal, Phone, Timestamp, Demo_Link_Sent, Status, Notes
-        col_mapping = {
-            'name': 0,
-            'selected_course': 1,
-            'education_level': 2,
-            'goal': 3,
-            'phone': 4,
-            'timestamp': 5,
-            'demo_link_sent': 6,
-            'conversation_status': 7,
-            'notes': 8
-        }
+        # Pad short rows (trailing empty cells aren't returned) to the full lead schema
+        if len(existing_row) < LEAD_COLUMN_COUNT:
+            existing_row.extend([""] * (LEAD_COLUMN_COUNT - len(existing_row)))
         
-        # Prepare update values (only update when appropriate)
-        updates = {}
-        for field, value in new_data.items():
-            # Skip None or empty values - don't overwrite existing data with empty
-            if value is None or value == "":
-                continue
-                
-            col_idx = col_mapping.get(field)
-            if col_idx is not None:
-                # Extend row if needed
-                while len(existing_row) <= col_idx:
-                    existing_row.append("")
-                
-                existing_value = existing_row[col_idx].strip() if col_idx < len(existing_row) else ""
-                
-                # Smart merge: Only update if:
-                # 1. Field is empty in existing row (fill the gap)
-                # 2. New value is different from existing (update with new data)
-                # Never overwrite existing data with empty values
-                if existing_value == "" or existing_value == "None" or existing_value.lower() == "none":
-                    # Fill empty field
-                    updates[col_idx] = value
-                    logger.debug(f"Updating empty field '{field}' with value: {value}")
-                elif existing_value.lower() != value.lower():
-                    # Update with new value (new data takes precedence)
-                    updates[col_idx] = value
-                    logger.debug(f"Updating field '{field}' from '{existing_value}' to '{value}'")
-                else:
-                    # Values are the same, skip update
-                    logger.debug(f"Skipping update for '{field}' - value unchanged: {value}")
+        updates = _merged_updates(existing_row, new_data, add_timestamp)
         
-        # Add/update timestamp if requested (always update timestamp when requested)
-        if add_timestamp:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            updates[col_mapping['timestamp']] = timestamp
-            logger.debug(f"Adding/updating timestamp: {timestamp}")
+        logger.debug("Row %s updates (column -> value): %r", row_num, updates)
         
-        # Apply updates
+        # Apply updates (single values:batchUpdate request for all changed cells)
         if updates:
-            for col_idx, value in updates.items():
-                worksheet.update_cell(row_num, col_idx + 1, value)  # gspread uses 1-indexed
+            _values_batch_update(worksheet, _coalesce_row_updates(row_num, updates))
+            _invalidate_sheet_values()
             
-            updated_field_names = [k for k, v in col_mapping.items() if v in updates]
-            logger.info(f"Updated row {row_num} with fields: {updated_field_names}")
+            if logger.isEnabledFor(logging.INFO):
+                updated_field_names = [k for k, v in LEAD_COLUMNS.items() if v in updates]
+                logger.info("Updated row %s with fields: %s", row_num, updated_field_names)
         else:
-            logger.info(f"No updates needed for row {row_num} - all fields already have values or no new data provided")
+            logger.info("No updates needed for row %s - all fields already have values or no new data provided", row_num)
         
     except Exception as e:
-        logger.error(f"Error updating row {row_num}: {e}", exc_info=True)
+        logger.error("Error updating row %s: %s", row_num, e, exc_info=logger.isEnabledFor(logging.DEBUG))
         raise
 
 
+# Lead upserts run off the agent's critical path on a single worker thread;
+# one worker keeps upserts in submission order, so a later call for the same
+# lead always sees the row written by an earlier one. On shutdown, flush_leads
+# waits at most LEAD_FLUSH_TIMEOUT_SECONDS for them.
+LEAD_FLUSH_TIMEOUT_SECONDS = 10
+_upsert_executor: Optional[ThreadPoolExecutor] = None
+_pending_upserts = set()
+_upsert_lock = threading.Lock()
+
+
+def _upsert_lead(data_dict: dict, add_timestamp: bool = False):
+    """Update the lead's existing row (matched by name, then phone) or queue a new row.
+    
+    Args:
+        data_dict: Normalized non-empty lead fields
+        add_timestamp: If True, add/update current timestamp
+    """
+    _ensure_gspread()
+    search_name = data_dict.get('name')
+    search_phone = data_dict.get('phone')
+    
+    with _write_lock:
+        # A lead still waiting in the write queue is merged in memory
+        pending_row = _find_pending_row(name=search_name, phone=search_phone)
+        if pending_row is not None:
+            with _pending_cond:
+                for col_idx, value in _merged_updates(pending_row, data_dict, add_timestamp).items():
+                    pending_row[col_idx] = value
+            logger.info("Merged lead data into queued row for %s", search_name or search_phone or "lead")
+            return
+        
+        worksheet = _get_sheets_client()
+        
+        # Try to find existing row by name or phone (for matching)
+        existing_row_num = None
+        existing_row = None
+        
+        if search_name:
+            existing_row_num, existing_row = _find_existing_row(worksheet, name=search_name)
+        if not existing_row_num and search_phone:
+            existing_row_num, existing_row = _find_existing_row(worksheet, phone=search_phone)
+        
+        if existing_row_num:
+            # Update existing row with smart merge
+            try:
+                _update_row(worksheet, existing_row_num, data_dict, add_timestamp=add_timestamp, existing_row=existing_row)
+            except gspread.exceptions.APIError as e:
+                if not _is_auth_api_error(e):
+                    raise
+                # Cached handle holds a stale session - re-authorize once and retry
+                _invalidate_sheets_client()
+                worksheet = _get_sheets_client()
+                _update_row(worksheet, existing_row_num, data_dict, add_timestamp=add_timestamp, existing_row=existing_row)
+        
+            logger.info("Updated existing row %s for %s", existing_row_num, search_name or search_phone or "lead")
+        else:
+            # Append new row (only include provided fields, empty strings for others)
+            current_time = time.strftime(TIMESTAMP_FORMAT) if add_timestamp else ""
+        
+            # Prepare row data - only include provided values, empty strings for missing fields
+            row_data = [
+                data_dict.get('name', ''),
+                data_dict.get('selected_course', ''),
+                data_dict.get('education_level', ''),
+                data_dict.get('goal', ''),
+                data_dict.get('phone', ''),
+                current_time,  # Timestamp (empty string if not requested)
+                "Yes" if data_dict.get('selected_course') else "",  # Demo_Link_Sent
+                "Demo Shared" if data_dict.get('selected_course') else "",  # Conversation_Status
+                data_dict.get('notes', '')
+            ]
+        
+            # Queue row for the background batch writer
+            _enqueue_lead_row(row_data)
+            logger.info(
+                "Queued new lead data for Google Sheets: %s, %s",
+                data_dict.get('name', 'Unknown'), data_dict.get('selected_course', 'No course')
+            )
+
+
+def _run_upsert(data_dict: dict, add_timestamp: bool):
+    """Upsert worker entry point: nobody waits on the result, so log failures here."""
+    try:
+        _upsert_lead(data_dict, add_timestamp)
+    except Exception as e:
+        logger.error("Error saving lead data to Google Sheets: %s", e, exc_info=True)
+
+
+def _discard_upsert(future):
+    with _upsert_lock:
+        _pending_upserts.discard(future)
+
+
+def _submit_upsert(data_dict: dict, add_timestamp: bool = False):
+    """Run a lead upsert on the background worker and return its future."""
+    global _upsert_executor
+    with _upsert_lock:
+        if _upsert_executor is None:
+            _upsert_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets-upsert")
+        future = _upsert_executor.submit(_run_upsert, data_dict, add_timestamp)
+        _pending_upserts.add(future)
+    future.add_done_callback(_discard_upsert)
+    return future
+
+
+def _wait_for_upserts(timeout: Optional[float] = None) -> set:
+    """Block until every submitted lead upsert has finished or timeout passes.
+    
+    Returns:
+        The futures still unfinished when the wait ended (empty if all finished)
+    """
+    with _upsert_lock:
+        pending = list(_pending_upserts)
+    if not pending:
+        return set()
+    return wait(pending, timeout=timeout).not_done
+
+
 def create_sheets_tools() -> List:
     """Create Google Sheets tools for the LangChain agent.
     
@@ -235,6 +883,8 @@ def create_sheets_tools() -> List:
         logger.warning("Skipping sheets tools. Check credentials and permissions.")
         return []
     
+    _register_exit_flush()
+    
     @tool("append_lead_data", args_schema=AppendLeadDataInput)
     def append_lead_data(
         name: Optional[str] = None,
@@ -267,92 +917,39 @@ def create_sheets_tools() -> List:
             add_timestamp: If True, add/update current timestamp with now() time (optional, default False)
         
         Returns:
-            Success message indicating whether row was updated or appended, and which fields were saved
+            Success message listing which fields were queued for saving
         """
         try:
-            worksheet = _get_sheets_client()
+            # Resolve the worksheet up front so configuration errors still reach the agent
+            _ensure_gspread()
+            _get_sheets_client()
             
             # Prepare data dictionary (only include non-None, non-empty values)
             # This ensures we don't overwrite existing data with empty values
-            data_dict = {}
-            if name is not None and name.strip():
-                data_dict['name'] = name.strip()
-            if selected_course is not None and selected_course.strip():
-                data_dict['selected_course'] = selected_course.strip()
-            if education_level is not None and education_level.strip():
-                data_dict['education_level'] = education_level.strip()
-            if goal is not None and goal.strip():
-                data_dict['goal'] = goal.strip()
-            if phone is not None and phone.strip():
-                data_dict['phone'] = phone.strip()
-            if notes is not None and notes.strip():
-                data_dict['notes'] = notes.strip()
+            fields = (
+                ('name', name),
+                ('selected_course', selected_course),
+                ('education_level', education_level),
+                ('goal', goal),
+                ('phone', phone),
+                ('notes', notes),
+            )
+            data_dict = {key: stripped for key, value in fields if value and (stripped := value.strip())}
             
             # Check if we have any data to save (including timestamp)
             if not data_dict and not add_timestamp:
                 return "No data provided to save. Please provide at least one field or set add_timestamp=True."
             
-            # Try to find existing row by name or phone (for matching)
-            existing_row_num = None
-            search_name = data_dict.get('name')
-            search_phone = data_dict.get('phone')
+            # Save in the background - the agent doesn't wait on the Sheets round-trips
+            _submit_upsert(data_dict, add_timestamp=add_timestamp)
             
-            if search_name:
-                existing_row_num = _find_existing_row(worksheet, name=search_name)
-            if not existing_row_num and search_phone:
-                existing_row_num = _find_existing_row(worksheet, phone=search_phone)
+            # Get list of saved fields
+            saved_fields = list(data_dict.keys())
+            if add_timestamp:
+                saved_fields.append("timestamp")
             
-            if existing_row_num:
-                # Update existing row with smart merge
-                _update_row(worksheet, existing_row_num, data_dict, add_timestamp=add_timestamp)
-                
-                # Get list of fields that were actually updated
-                updated_fields = []
-                if data_dict:
-                    # Check which fields were provided
-                    for field in data_dict.keys():
-                        updated_fields.append(field.replace('_', ' '))
-                if add_timestamp:
-                    updated_fields.append("timestamp")
-                
-                lead_identifier = search_name or search_phone or "lead"
-                logger.info(f"Updated existing row {existing_row_num} for {lead_identifier}")
-                
-                if updated_fields:
-                    return f"Successfully updated lead data in Google Sheets (row {existing_row_num}). Updated fields: {', '.join(updated_fields)}"
-                else:
-                    return f"Lead data already exists in Google Sheets (row {existing_row_num}). No updates needed."
-            else:
-                # Append new row (only include provided fields, empty strings for others)
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S") if add_timestamp else ""
-                
-                # Prepare row data - only include provided values, empty strings for missing fields
-                row_data = [
-                    data_dict.get('name', ''),
-                    data_dict.get('selected_course', ''),
-                    data_dict.get('education_level', ''),
-                    data_dict.get('goal', ''),
-                    data_dict.get('phone', ''),
-                    current_time,  # Timestamp (empty string if not requested)
-                    "Yes" if data_dict.get('selected_course') else "",  # Demo_Link_Sent
-                    "Demo Shared" if data_dict.get('selected_course') else "",  # Conversation_Status
-                    data_dict.get('notes', '')
-                ]
-                
-                # Append row to sheet
-                worksheet.append_row(row_data)
-                
-                # Get list of saved fields
-                saved_fields = list(data_dict.keys())
-                if add_timestamp:
-                    saved_fields.append("timestamp")
-                
-                lead_name = data_dict.get('name', 'Unknown')
-                course = data_dict.get('selected_course', 'No course')
-                logger.info(f"Appended new lead data to Google Sheets: {lead_name}, {course}")
-                
-                field_names = [f.replace('_', ' ') for f in saved_fields]
-                return f"Successfully saved lead data to Google Sheets (new row). Saved fields: {', '.join(field_names)}"
+            field_names = [f.replace('_', ' ') for f in saved_fields]
+            return f"Successfully queued lead data for Google Sheets. Saved fields: {', '.join(field_names)}"
         
         except ImportError as e:
             logger.error(f"Google Sheets libraries not installed: {e}")
@@ -364,7 +961,7 @@ def create_sheets_tools() -> List:
             logger.error(f"Credentials file not found: {e}")
             return f"Error: Credentials file not found. Please check GOOGLE_SHEETS_CREDENTIALS_PATH."
         except Exception as e:
-            logger.error(f"Error saving lead data to Google Sheets: {e}", exc_info=True)
+            logger.error("Error saving lead data to Google Sheets: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             # Return user-friendly error message (don't expose internal details)
             return f"Error saving lead data to Google Sheets. Please try again or contact support if the issue persists."
     
@@ -2,115 +2,414 @@
 
 All tools are optimized for sub-10ms query performance.
 """
+import io
+import time
+import atexit
 import logging
-from typing import List, Optional
+import threading
+import difflib
+import unicodedata
+from typing import List, Literal, Optional
 from langchain_core.tools import tool
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 logger = logging.getLogger(__name__)
 
+# Course columns never shown to the agent (row id and bookkeeping columns)
+_COURSE_SKIP = frozenset({"id", "created_at", "updated_at", "embedding"})
+
+# (column, display template) pairs, in output order
+_FAQ_FIELDS = (
+    ("course_name", "Course: {}"),
+    ("question", "Question: {}"),
+    ("answer", "Answer: {}"),
+)
+_PROF_FIELDS = (
+    ("full_name", "Name: {}"),
+    ("display_name_for_students", "Display Name: {}"),
+    ("qualifications", "Qualifications: {}"),
+    ("total_years_of_experience", "Experience: {} years"),
+    ("specializations", "Specializations: {}"),
+    ("courses_currently_teaching", "Teaching: {}"),
+    ("certifications", "Certifications: {}"),
+    ("short_bio_for_agent", "Bio: {}"),
+)
+# (column, display template, link_type that selects it); course_link only in the full listing
+_LINK_FIELDS = (
+    ("demo_link", "Demo_Link: {}", "demo"),
+    ("pdf_link", "Pdf_Link: {}", "pdf"),
+    ("course_link", "Course_Link: {}", None),
+)
+
+# Shorthand the agent (and users) use for courses -> exact course_name in the
+# database (lowercase keys). Plain "CTA" is deliberately absent: it has online
+# and per-city variants, and the agent must ask which one before fetching.
+_COURSE_ALIASES = {
+    "cta online": "Certified Tax Advisor - Online",
+    "cta - online": "Certified Tax Advisor - Online",
+    "cta islamabad": "Certified Tax Advisor - Islamabad",
+    "cta karachi": "Certified Tax Advisor - Karachi",
+    "cta lahore": "Certified Tax Advisor - Lahore",
+    "usa": "USA Taxation Course",
+    "usa tax": "USA Taxation Course",
+    "usa taxation": "USA Taxation Course",
+    "uk": "UK Taxation Course",
+    "uk tax": "UK Taxation Course",
+    "uk taxation": "UK Taxation Course",
+    "uae": "UAE Taxation Course",
+    "uae tax": "UAE Taxation Course",
+    "uae taxation": "UAE Taxation Course",
+    "saudi": "Saudi Taxation Course",
+    "saudi tax": "Saudi Taxation Course",
+    "saudi taxation": "Saudi Taxation Course",
+    "canada": "Canadian Taxation Course",
+    "canadian tax": "Canadian Taxation Course",
+    "canadian taxation": "Canadian Taxation Course",
+    "import export": "Import and Export Course",
+    "import & export": "Import and Export Course",
+    "import & export course": "Import and Export Course",
+    "llc": "LLC Formation Course",
+    "llc formation": "LLC Formation Course",
+    "psx": "Pakistan Stock Exchange Course",
+    "stock exchange": "Pakistan Stock Exchange Course",
+    "sales tax": "Sales Tax Mastery Course",
+    "company secretary": "Company Secretary & Secretarial Practices",
+    "advance taxation": "Advance Taxation & Litigations",
+}
+
+
+def _canonical_course(course_name: str) -> str:
+    """Map known course shorthand to the exact course_name; other names pass through unchanged."""
+    return _COURSE_ALIASES.get(course_name.strip().lower(), course_name)
+
+
+# Minimum difflib similarity for treating a missed name as a misspelled course
+COURSE_MATCH_CUTOFF = 0.7
+
+
+def _closest_course(supabase_service, course_name: str) -> Optional[str]:
+    """Return the real course name closest to a misspelled one, or None if nothing is close."""
+    by_lower = {name.lower(): name for name in supabase_service.get_course_names()}
+    matches = difflib.get_close_matches(course_name.strip().lower(), by_lower, n=1, cutoff=COURSE_MATCH_CUTOFF)
+    return by_lower[matches[0]] if matches else None
+
+
+# Returned by the read tools while Supabase is unreachable, so the agent doesn't
+# report a database outage as "no course found"
+DATABASE_UNAVAILABLE_MESSAGE = "Error: Course database is temporarily unavailable. Please try again shortly."
+
+
+# search_courses shows this much of each course description
+SEARCH_DESCRIPTION_MAX_CHARS = 200
+
+
+def _format_course_result(i: int, course: dict) -> Optional[str]:
+    """Format one search_courses hit as "i. Course: ... | Description: ...", or None if it has neither."""
+    name = course.get("course_name")
+    desc = course.get("course_description")
+    if desc and len(desc) > SEARCH_DESCRIPTION_MAX_CHARS:
+        # Truncate long descriptions
+        desc = desc[:SEARCH_DESCRIPTION_MAX_CHARS] + "..."
+    if name and desc:
+        return f"{i}. Course: {name} | Description: {desc}"
+    if name:
+        return f"{i}. Course: {name}"
+    if desc:
+        return f"{i}. Description: {desc}"
+    return None
+
+
+# Mathematical Alphanumeric Symbols (bold/italic/script/sans/mono letters and
+# digits) mapped to their plain ASCII letter, built once from the NFKD table
+_STYLED_TO_ASCII = {
+    codepoint: plain
+    for codepoint in range(0x1D400, 0x1D800)
+    if (plain := unicodedata.normalize('NFKD', chr(codepoint))).isascii() and plain
+}
+
+
+def _ascii_clean(value: str) -> str:
+    """Replace bold/italic Unicode characters with their closest ASCII equivalent.
+    
+    Styled letters are swapped with one str.translate pass; only text that still
+    has other non-ASCII characters goes through NFKD and drops what's left.
+    """
+    value = value.translate(_STYLED_TO_ASCII)
+    if value.isascii():
+        return value
+    return unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
+
+
+# Formatted company info, reused while the service keeps returning the same
+# cached dict: (source dict, full text, field -> "field: value" line, field names)
+_company_info_formatted: tuple = (None, "", {}, "")
+
+
+def _formatted_company_info(company_info: dict) -> tuple:
+    """Return (full text, field -> line, field names) for company_info, formatting it once per cached dict."""
+    global _company_info_formatted
+    source, text, lines, fields = _company_info_formatted
+    if source is not company_info:
+        lines = {key: f"{key}: {value}" for key, value in company_info.items() if value is not None and value != ""}
+        text = "\n".join(lines.values())
+        fields = ", ".join(company_info.keys())
+        _company_info_formatted = (company_info, text, lines, fields)
+    return text, lines, fields
+
+
+# "Available fields" text for fetch_course_details misses, reused while the
+# service keeps returning the same cached row: (source row, field names)
+_course_fields_listing: tuple = (None, "")
+
+
+def _available_course_fields(course: dict) -> str:
+    """Return the course row's shown column names, joined once per cached row."""
+    global _course_fields_listing
+    source, fields = _course_fields_listing
+    if source is not course:
+        fields = ", ".join(key for key in course if key not in _COURSE_SKIP)
+        _course_fields_listing = (course, fields)
+    return fields
+
+
+# Argument descriptions the model sees in each tool's schema, keyed "<tool>.<argument>"
+_DESCRIPTIONS = {
+    "course_links.course_name": "EXACT course name from database (e.g., 'Certified Tax Advisor - Online', 'USA Taxation Course', 'Saudi Taxation Course'). Use the full course name, not abbreviations.",
+    "course_links.link_type": "Type of link to fetch: 'demo' for demo video link, 'pdf' for PDF/brochure link, or None for all available links",
+    "course_details.course_name": "EXACT course name from database. Examples: 'Certified Tax Advisor - Online', 'USA Taxation Course', 'UAE Taxation Course', 'Saudi Taxation Course', 'Advance Taxation & Litigations'. Use full course name as stored in Supabase, not abbreviations.",
+    "course_details.field": "Specific field to fetch: 'course_fee_physical', 'course_fee_online', 'course_duration', 'professor_name', 'course_start_date_or_last_enrollment_date', 'mode_of_courses', 'course_benefits'. Leave as None to get ALL course details (recommended for pricing queries).",
+    "faqs.query": "Natural language search query to find relevant FAQs (e.g., 'installment', 'refund policy', 'certificate', 'job guarantee'). Use keywords from user's question. Leave as None to get general FAQs.",
+    "faqs.course_name": "EXACT course name from database (e.g., 'USA Taxation Course') to filter FAQs specific to that course. Leave as None for general FAQs.",
+    "faqs.top_k": "Number of FAQ results to return (default: 5). Use 3 for quick answers, 10 for comprehensive searches.",
+    "professor.professor_name": "Professor's name (e.g., 'Rai Basharat Ali', 'Sir Rai Basharat Ali'). Leave as None if you only have course_name.",
+    "professor.course_name": "EXACT course name from database (e.g., 'Certified Tax Advisor - Online', 'USA Taxation Course') to find the professor teaching that course. Use this when user asks 'USA Taxation ka teacher kaun hai?'. Leave as None if you have professor_name.",
+    "company_info.field": "Specific field to fetch (e.g., 'Main Contact Number', 'WhatsApp Number', 'Email Address', 'Website URL', 'Facebook Page', 'Instagram Handle', 'Office Location'). Leave as None to get ALL company information.",
+    "search_courses.search_term": "Keywords to search in course names and descriptions (e.g., 'tax', 'USA', 'accounting', 'UAE', 'export', 'stock exchange'). Searches both course names and descriptions.",
+    "search_courses.limit": "Maximum number of course results to return (default: 10). Use 5 for quick searches, 15 for comprehensive listings.",
+    "lead.name": "Lead's full name (e.g., 'Hassan Ahmed', 'Ali Khan'). Collect this during conversation.",
+    "lead.phone": "Lead's phone number (e.g., '03001234567', '+923001234567') OR conversation_id from chat API (e.g., 'wa_1234567890'). Used to identify returning customers. Stores in phone_number column.",
+    "lead.selected_course": "EXACT course name they selected (e.g., 'Certified Tax Advisor - Online', 'USA Taxation Course'). REQUIRED field - always provide the course they're interested in.",
+    "lead.education_level": "Their education level (e.g., 'Intermediate', 'Bachelors', 'Masters', 'CA', 'ACCA'). Collect when qualifying the lead.",
+    "lead.goal": "Their goal/motivation in their own words (e.g., 'Start own practice', 'Get job in Big 4', 'Learn for business'). Collect to understand their needs.",
+    "lead.notes": "Additional notes about the conversation, their concerns, objections, or specific requests (e.g., 'Asked about installments', 'Wants to join next batch', 'Referred by friend').",
+    "lead.add_timestamp": "Always True - timestamp is added automatically to track when lead was created/updated.",
+}
+
+
+# Shared by every tool input schema: inputs are read-only, stray whitespace from
+# the model is trimmed and unknown keys are dropped instead of rejected
+_INPUT_CONFIG = ConfigDict(frozen=True, str_strip_whitespace=True, extra="ignore")
+
 
 class CourseLinksInput(BaseModel):
     """Input schema for fetching course links."""
-    course_name: str = Field(
-        description="EXACT course name from database (e.g., 'Certified Tax Advisor - Online', 'USA Taxation Course', 'Saudi Taxation Course'). Use the full course name, not abbreviations."
-    )
-    link_type: Optional[str] = Field(
+    model_config = _INPUT_CONFIG
+
+    course_name: str = Field(description=_DESCRIPTIONS["course_links.course_name"])
+    link_type: Optional[Literal["demo", "pdf"]] = Field(
         default=None,
-        description="Type of link to fetch: 'demo' for demo video link, 'pdf' for PDF/brochure link, or None for all available links"
+        description=_DESCRIPTIONS["course_links.link_type"]
     )
 
+    @field_validator("link_type", mode="before")
+    @classmethod
+    def _lowercase_link_type(cls, value):
+        return value.lower() if isinstance(value, str) else value
+
 
 class CourseDetailsInput(BaseModel):
     """Input schema for fetching course details."""
-    course_name: str = Field(
-        description="EXACT course name from database. Examples: 'Certified Tax Advisor - Online', 'USA Taxation Course', 'UAE Taxation Course', 'Saudi Taxation Course', 'Advance Taxation & Litigations'. Use full course name as stored in Supabase, not abbreviations."
-    )
+    model_config = _INPUT_CONFIG
+
+    course_name: str = Field(description=_DESCRIPTIONS["course_details.course_name"])
     field: Optional[str] = Field(
         default=None,
-        description="Specific field to fetch: 'course_fee_physical', 'course_fee_online', 'course_duration', 'professor_name', 'course_start_date_or_last_enrollment_date', 'mode_of_courses', 'course_benefits'. Leave as None to get ALL course details (recommended for pricing queries)."
+        description=_DESCRIPTIONS["course_details.field"]
     )
 
 
 class FAQsInput(BaseModel):
     """Input schema for fetching FAQs."""
+    model_config = _INPUT_CONFIG
+
     query: Optional[str] = Field(
         default=None,
-        description="Natural language search query to find relevant FAQs (e.g., 'installment', 'refund policy', 'certificate', 'job guarantee'). Use keywords from user's question. Leave as None to get general FAQs."
+        description=_DESCRIPTIONS["faqs.query"]
     )
     course_name: Optional[str] = Field(
         default=None,
-        description="EXACT course name from database (e.g., 'USA Taxation Course') to filter FAQs specific to that course. Leave as None for general FAQs."
+        description=_DESCRIPTIONS["faqs.course_name"]
     )
     top_k: int = Field(
         default=5,
-        description="Number of FAQ results to return (default: 5). Use 3 for quick answers, 10 for comprehensive searches."
+        description=_DESCRIPTIONS["faqs.top_k"]
     )
 
 
 class ProfessorInput(BaseModel):
     """Input schema for fetching professor information."""
+    model_config = _INPUT_CONFIG
+
     professor_name: Optional[str] = Field(
         default=None,
-        description="Professor's name (e.g., 'Rai Basharat Ali', 'Sir Rai Basharat Ali'). Leave as None if you only have course_name."
+        description=_DESCRIPTIONS["professor.professor_name"]
     )
     course_name: Optional[str] = Field(
         default=None,
-        description="EXACT course name from database (e.g., 'Certified Tax Advisor - Online', 'USA Taxation Course') to find the professor teaching that course. Use this when user asks 'USA Taxation ka teacher kaun hai?'. Leave as None if you have professor_name."
+        description=_DESCRIPTIONS["professor.course_name"]
     )
 
 
 class CompanyInfoInput(BaseModel):
     """Input schema for fetching company information."""
+    model_config = _INPUT_CONFIG
+
     field: Optional[str] = Field(
         default=None,
-        description="Specific field to fetch (e.g., 'Main Contact Number', 'WhatsApp Number', 'Email Address', 'Website URL', 'Facebook Page', 'Instagram Handle', 'Office Location'). Leave as None to get ALL company information."
+        description=_DESCRIPTIONS["company_info.field"]
     )
 
 
 class SearchCoursesInput(BaseModel):
     """Input schema for searching courses."""
-    search_term: str = Field(
-        description="Keywords to search in course names and descriptions (e.g., 'tax', 'USA', 'accounting', 'UAE', 'export', 'stock exchange'). Searches both course names and descriptions."
-    )
+    model_config = _INPUT_CONFIG
+
+    search_term: str = Field(description=_DESCRIPTIONS["search_courses.search_term"])
     limit: int = Field(
         default=10,
-        description="Maximum number of course results to return (default: 10). Use 5 for quick searches, 15 for comprehensive listings."
+        description=_DESCRIPTIONS["search_courses.limit"]
     )
 
 
 class AppendLeadDataInput(BaseModel):
     """Input schema for appending/updating lead data in Supabase."""
+    model_config = _INPUT_CONFIG
+
     name: Optional[str] = Field(
         default=None,
-        description="Lead's full name (e.g., 'Hassan Ahmed', 'Ali Khan'). Collect this during conversation."
+        description=_DESCRIPTIONS["lead.name"]
     )
     phone: Optional[str] = Field(
         default=None,
-        description="Lead's phone number (e.g., '03001234567', '+923001234567') OR conversation_id from chat API (e.g., 'wa_1234567890'). Used to identify returning customers. Stores in phone_number column."
+        description=_DESCRIPTIONS["lead.phone"]
     )
     selected_course: Optional[str] = Field(
         default=None,
-        description="EXACT course name they selected (e.g., 'Certified Tax Advisor - Online', 'USA Taxation Course'). REQUIRED field - always provide the course they're interested in."
+        description=_DESCRIPTIONS["lead.selected_course"]
     )
     education_level: Optional[str] = Field(
         default=None,
-        description="Their education level (e.g., 'Intermediate', 'Bachelors', 'Masters', 'CA', 'ACCA'). Collect when qualifying the lead."
+        description=_DESCRIPTIONS["lead.education_level"]
     )
     goal: Optional[str] = Field(
         default=None,
-        description="Their goal/motivation in their own words (e.g., 'Start own practice', 'Get job in Big 4', 'Learn for business'). Collect to understand their needs."
+        description=_DESCRIPTIONS["lead.goal"]
     )
     notes: Optional[str] = Field(
         default=None,
-        description="Additional notes about the conversation, their concerns, objections, or specific requests (e.g., 'Asked about installments', 'Wants to join next batch', 'Referred by friend')."
+        description=_DESCRIPTIONS["lead.notes"]
     )
     add_timestamp: bool = Field(
         default=True,
-        description="Always True - timestamp is added automatically to track when lead was created/updated."
+        description=_DESCRIPTIONS["lead.add_timestamp"]
     )
 
 
+# Lead writes run on a background thread: the agent saves the lead right before
+# sharing the demo link, so the reply shouldn't wait on the Supabase lookup and
+# write. One worker drains the queue in order, so progressive updates for the
+# same lead are applied in the order the agent sent them. The worker waits
+# LEAD_WRITE_WINDOW_SECONDS after the first queued write and merges updates for
+# the same lead collected in that window into a single write.
+LEAD_WRITE_WINDOW_SECONDS = 0.5
+_pending_leads: List[tuple] = []
+_leads_cond = threading.Condition()
+_lead_write_lock = threading.Lock()
+_lead_worker: Optional[threading.Thread] = None
+
+
+def _lead_key(payload: dict) -> Optional[str]:
+    """Identify the lead a write is for: phone if given, else name (None if neither)."""
+    phone = (payload.get("phone") or "").strip()
+    if phone:
+        return "phone:" + phone
+    name = (payload.get("name") or "").strip().lower()
+    return "name:" + name if name else None
+
+
+def _coalesce_lead_writes(batch: List[tuple]) -> List[tuple]:
+    """Merge queued writes for the same lead into one, keeping first-seen order.
+    
+    Later non-empty values win, matching how the service merges an update into
+    the existing row; add_timestamp is kept if any of the merged writes set it.
+    """
+    merged = {}
+    for supabase_service, payload in batch:
+        key = _lead_key(payload)
+        slot = (id(supabase_service), key) if key else object()
+        if slot in merged:
+            current = merged[slot][1]
+            for field, value in payload.items():
+                if field == "add_timestamp":
+                    current[field] = current[field] or value
+                elif value and value.strip():
+                    current[field] = value
+        else:
+            merged[slot] = (supabase_service, dict(payload))
+    return list(merged.values())
+
+
+def _write_pending_leads():
+    """Write every queued lead to Supabase, oldest first, one write per lead."""
+    with _lead_write_lock:
+        with _leads_cond:
+            batch = _pending_leads[:]
+            _pending_leads.clear()
+        for supabase_service, payload in _coalesce_lead_writes(batch):
+            try:
+                result = supabase_service.append_lead_data(**payload)
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+            if result.get("status") == "success":
+                logger.info("✓ Lead data %s: %s in %.2fms", result.get("action", "saved"), result.get("lead_id"), result.get("elapsed_ms", 0))
+            else:
+                logger.error("Failed to save lead data: %s", result.get("message", "Unknown error"))
+
+
+def _lead_worker_loop():
+    """Background loop: wait for queued leads and write them."""
+    while True:
+        with _leads_cond:
+            _leads_cond.wait_for(lambda: _pending_leads)
+        time.sleep(LEAD_WRITE_WINDOW_SECONDS)
+        _write_pending_leads()
+
+
+def _queue_lead_write(supabase_service, payload: dict):
+    """Queue a lead write for the background worker, starting it if needed."""
+    global _lead_worker
+    with _leads_cond:
+        _pending_leads.append((supabase_service, payload))
+        if _lead_worker is None or not _lead_worker.is_alive():
+            _lead_worker = threading.Thread(target=_lead_worker_loop, name="supabase-lead-writer", daemon=True)
+            _lead_worker.start()
+        _leads_cond.notify()
+
+
+def flush_lead_writes():
+    """Write any queued leads to Supabase now.
+    
+    Safe to call at any time (e.g. on application shutdown); never raises.
+    """
+    try:
+        _write_pending_leads()
+    except Exception as e:
+        logger.error("Error flushing queued lead writes: %s", e)
+
+
+atexit.register(flush_lead_writes)
+
+
 def create_supabase_tools(supabase_service) -> List:
     """Create all optimized Supabase database tools for the LangChain agent.
     
@@ -127,11 +426,14 @@ def create_supabase_tools(supabase_service) -> List:
         logger.warning("No supabase_service provided, skipping Supabase tools creation")
         return []
     
+    # Imported here: core imports this module through the agent
+    from core.supabase_service import SupabaseUnavailableError
+    
     tools = []
     
     # 1. Course Links Tool (optimized)
     @tool("fetch_course_links", args_schema=CourseLinksInput)
-    def fetch_course_links(course_name: str, link_type: Optional[str] = None) -> str:
+    def fetch_course_links(course_name: str, link_type: Optional[Literal["demo", "pdf"]] = None) -> str:
         """Always use this tool to Fetch course links from database. Use for demo links, PDF links, or course page links.
         
         Use this tool when you need to share any link with the user. Returns actual URLs.
@@ -144,34 +446,31 @@ def create_supabase_tools(supabase_service) -> List:
             Link URLs or error message
         """
         try:
-            courses = supabase_service.get_course_links(course_name)
+            courses = supabase_service.get_course_links(_canonical_course(course_name))
+            if not courses and (closest := _closest_course(supabase_service, course_name)):
+                # Typo tolerance: retry with the closest real course name
+                courses = supabase_service.get_course_links(closest)
             
             if not courses:
                 return f"Error: No course found matching '{course_name}' in database."
             
             # Use first matching course (optimized: limit(1) in query)
             course = courses[0]
-            result_parts = []
-            
-            if link_type is None or link_type.lower() == "demo":
-                if course.get("demo_link"):
-                    result_parts.append(f"Demo_Link: {course['demo_link']}")
-            
-            if link_type is None or link_type.lower() == "pdf":
-                if course.get("pdf_link"):
-                    result_parts.append(f"Pdf_Link: {course['pdf_link']}")
-            
-            if link_type is None:
-                if course.get("course_link"):
-                    result_parts.append(f"Course_Link: {course['course_link']}")
+            result_parts = [
+                template.format(value)
+                for key, template, kind in _LINK_FIELDS
+                if link_type in (None, kind) and (value := course.get(key))
+            ]
             
             if not result_parts:
                 return f"Error: No {link_type or 'links'} found for course '{course_name}'."
             
             return "\n".join(result_parts)
         
+        except SupabaseUnavailableError:
+            return DATABASE_UNAVAILABLE_MESSAGE
         except Exception as e:
-            logger.error(f"Error fetching course links: {e}", exc_info=True)
+            logger.error("Error fetching course links: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return f"Error fetching course links: {str(e)}"
     
     tools.append(fetch_course_links)
@@ -205,7 +504,10 @@ def create_supabase_tools(supabase_service) -> List:
             Course details with ALL available fields or error message
         """
         try:
-            courses = supabase_service.get_course_details(course_name)
+            courses = supabase_service.get_course_details(_canonical_course(course_name))
+            if not courses and (closest := _closest_course(supabase_service, course_name)):
+                # Typo tolerance: retry with the closest real course name
+                courses = supabase_service.get_course_details(closest)
             
             if not courses:
                 return f"Error: No course found matching '{course_name}' in database."
@@ -213,33 +515,27 @@ def create_supabase_tools(supabase_service) -> List:
             course = courses[0]  # Optimized: limit(1) in query
             
             if field:
-                # Return specific field (fast lookup)
-                field_lower = field.lower().replace(" ", "_")
-                value = course.get(field_lower) or course.get(field)
-                if value:
+                # Return specific field: course columns are snake_case, so one lookup
+                value = course.get(field.lower().replace(" ", "_"))
+                if value is not None and value != "":
                     return f"{field}: {value}"
-                return f"Error: Field '{field}' not found. Available fields: {', '.join(course.keys())}"
+                return f"Error: Field '{field}' not found. Available fields: {_available_course_fields(course)}"
             else:
-                # Return all fields
-                result_parts = []
-                for key, value in course.items():
-                    if value is not None and value != "" and key != "id":
-                        # Clean Unicode formatting characters to avoid encoding issues
-                        if isinstance(value, str):
-                            # Replace bold/italic Unicode characters with regular ASCII
-                            import unicodedata
-                            # Normalize to closest ASCII equivalent
-                            value_clean = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
-                            result_parts.append(f"{key}: {value_clean}")
-                        else:
-                            result_parts.append(f"{key}: {value}")
+                # Return all fields, cleaning Unicode formatting characters to avoid encoding issues
+                result_parts = [
+                    f"{key}: {_ascii_clean(value) if isinstance(value, str) else value}"
+                    for key, value in course.items()
+                    if value is not None and value != "" and key not in _COURSE_SKIP
+                ]
 
                 if result_parts:
                     return "\n".join(result_parts)
                 return f"Error: No data found for course '{course_name}'"
         
+        except SupabaseUnavailableError:
+            return DATABASE_UNAVAILABLE_MESSAGE
         except Exception as e:
-            logger.error(f"Error fetching course details: {e}", exc_info=True)
+            logger.error("Error fetching course details: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return f"Error fetching course details: {str(e)}"
 
     tools.append(fetch_course_details)
@@ -263,24 +559,24 @@ def create_supabase_tools(supabase_service) -> List:
             if not faqs:
                 return f"No FAQs found" + (f" matching query: '{query}'" if query else "") + (f" for course: '{course_name}'" if course_name else "")
             
-            formatted_faqs = []
+            # Write blocks straight into one buffer (no per-FAQ intermediate strings)
+            buf = io.StringIO()
             for i, faq in enumerate(faqs, 1):
-                parts = []
-                if faq.get("course_name"):
-                    parts.append(f"Course: {faq['course_name']}")
-                if faq.get("question"):
-                    parts.append(f"Question: {faq['question']}")
-                if faq.get("answer"):
-                    parts.append(f"Answer: {faq['answer']}")
+                parts = [template.format(value) for key, template in _FAQ_FIELDS if (value := faq.get(key))]
                 if parts:
-                    formatted_faqs.append(f"FAQ {i}:\n" + " | ".join(parts))
+                    if buf.tell():
+                        buf.write("\n\n")
+                    buf.write(f"FAQ {i}:\n")
+                    buf.write(" | ".join(parts))
             
-            if formatted_faqs:
-                return "\n\n".join(formatted_faqs)
+            if buf.tell():
+                return buf.getvalue()
             return "No FAQs found."
         
+        except SupabaseUnavailableError:
+            return DATABASE_UNAVAILABLE_MESSAGE
         except Exception as e:
-            logger.error(f"Error fetching FAQs: {e}", exc_info=True)
+            logger.error("Error fetching FAQs: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return f"Error fetching FAQs: {str(e)}"
     
     tools.append(fetch_faqs)
@@ -307,24 +603,8 @@ def create_supabase_tools(supabase_service) -> List:
             
             formatted_results = []
             for prof in professors[:5]:  # Limit to 5 for speed
-                parts = []
                 # Format key fields nicely
-                if prof.get("full_name"):
-                    parts.append(f"Name: {prof['full_name']}")
-                if prof.get("display_name_for_students"):
-                    parts.append(f"Display Name: {prof['display_name_for_students']}")
-                if prof.get("qualifications"):
-                    parts.append(f"Qualifications: {prof['qualifications']}")
-                if prof.get("total_years_of_experience"):
-                    parts.append(f"Experience: {prof['total_years_of_experience']} years")
-                if prof.get("specializations"):
-                    parts.append(f"Specializations: {prof['specializations']}")
-                if prof.get("courses_currently_teaching"):
-                    parts.append(f"Teaching: {prof['courses_currently_teaching']}")
-                if prof.get("certifications"):
-                    parts.append(f"Certifications: {prof['certifications']}")
-                if prof.get("short_bio_for_agent"):
-                    parts.append(f"Bio: {prof['short_bio_for_agent']}")
+                parts = [template.format(value) for key, template in _PROF_FIELDS if (value := prof.get(key))]
                 if parts:
                     formatted_results.append(" | ".join(parts))
             
@@ -332,8 +612,10 @@ def create_supabase_tools(supabase_service) -> List:
                 return "\n\n".join(formatted_results)
             return "No professor information found."
         
+        except SupabaseUnavailableError:
+            return DATABASE_UNAVAILABLE_MESSAGE
         except Exception as e:
-            logger.error(f"Error fetching professor info: {e}", exc_info=True)
+            logger.error("Error fetching professor info: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return f"Error fetching professor info: {str(e)}"
     
     tools.append(fetch_professor_info)
@@ -352,30 +634,28 @@ def create_supabase_tools(supabase_service) -> List:
             Company information or error message
         """
         try:
-            company_info = supabase_service.get_company_info(field_name=field)
+            # Field lookups are served from the full (cached) company info
+            company_info = supabase_service.get_company_info()
             
             if not company_info:
                 return "Error: Company information not available in database."
             
+            text, lines, fields = _formatted_company_info(company_info)
             if field:
                 # Return specific field (fast lookup)
-                value = company_info.get(field)
-                if value:
-                    return f"{field}: {value}"
-                return f"Error: Field '{field}' not found. Available fields: {', '.join(company_info.keys()) if isinstance(company_info, dict) else 'N/A'}"
-            else:
-                # Return all fields
-                result_parts = []
-                for key, value in company_info.items():
-                    if value is not None and value != "":
-                        result_parts.append(f"{key}: {value}")
-                
-                if result_parts:
-                    return "\n".join(result_parts)
-                return "No company information found."
+                line = lines.get(field)
+                if line:
+                    return line
+                return f"Error: Field '{field}' not found. Available fields: {fields}"
+            
+            if text:
+                return text
+            return "No company information found."
         
+        except SupabaseUnavailableError:
+            return DATABASE_UNAVAILABLE_MESSAGE
         except Exception as e:
-            logger.error(f"Error fetching company info: {e}", exc_info=True)
+            logger.error("Error fetching company info: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return f"Error fetching company info: {str(e)}"
     
     tools.append(fetch_company_info)
@@ -400,26 +680,15 @@ def create_supabase_tools(supabase_service) -> List:
             if not courses:
                 return f"No courses found matching '{search_term}'"
             
-            formatted_courses = []
-            for i, course in enumerate(courses, 1):
-                parts = []
-                if course.get("course_name"):
-                    parts.append(f"Course: {course['course_name']}")
-                if course.get("course_description"):
-                    # Truncate long descriptions
-                    desc = course['course_description']
-                    if len(desc) > 200:
-                        desc = desc[:200] + "..."
-                    parts.append(f"Description: {desc}")
-                if parts:
-                    formatted_courses.append(f"{i}. " + " | ".join(parts))
-            
-            if formatted_courses:
-                return "\n\n".join(formatted_courses)
+            result = "\n\n".join(filter(None, (_format_course_result(i, course) for i, course in enumerate(courses, 1))))
+            if result:
+                return result
             return f"No courses found matching '{search_term}'"
         
+        except SupabaseUnavailableError:
+            return DATABASE_UNAVAILABLE_MESSAGE
         except Exception as e:
-            logger.error(f"Error searching courses: {e}", exc_info=True)
+            logger.error("Error searching courses: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return f"Error searching courses: {str(e)}"
     
     tools.append(search_courses)
@@ -467,47 +736,39 @@ def create_supabase_tools(supabase_service) -> List:
             add_timestamp: Always True (timestamp added automatically)
 
         Returns:
-            Success/error message with lead ID and action (created/updated)
+            Confirmation that the lead is being saved, or an error message if no data was given
 
         Examples:
             CREATE (new lead):
             - append_lead_data(name="Hassan", phone="03001234567", selected_course="CTA", education_level="Bachelors", goal="Start tax consultancy", add_timestamp=True)
-            - Returns: "✓ Lead data created successfully (ID: abc-123). You can now share the demo link."
+            - Returns: "✓ Lead data accepted successfully and is being saved. You can now share the demo link."
 
             UPDATE (existing lead):
             - append_lead_data(phone="03001234567", notes="Interested in demo, will join next batch", add_timestamp=True)
-            - Returns: "✓ Lead data updated successfully (ID: abc-123). You can now share the demo link."
+            - Returns: "✓ Lead data accepted successfully and is being saved. You can now share the demo link."
 
             MINIMAL (just course):
             - append_lead_data(selected_course="CTA", add_timestamp=True)
-            - Returns: "✓ Lead data created successfully (ID: def-456). You can now share the demo link."
+            - Returns: "✓ Lead data accepted successfully and is being saved. You can now share the demo link."
         """
         try:
-            result = supabase_service.append_lead_data(
-                name=name,
-                phone=phone,
-                selected_course=selected_course,
-                education_level=education_level,
-                goal=goal,
-                notes=notes,
-                add_timestamp=add_timestamp
-            )
-
-            if result.get("status") == "success":
-                action = result.get("action", "saved")
-                lead_id = result.get("lead_id", "unknown")
-                elapsed = result.get("elapsed_ms", 0)
-
-                logger.info(f"✓ Lead data {action}: {lead_id} in {elapsed:.2f}ms")
-
-                return f"✓ Lead data {action} successfully (ID: {lead_id}). You can now share the demo link."
-            else:
-                error_msg = result.get("message", "Unknown error")
-                logger.error(f"Failed to save lead data: {error_msg}")
-                return f"Error saving lead data: {error_msg}"
+            if not any(value and value.strip() for value in (name, phone, selected_course, education_level, goal, notes)):
+                return "Error saving lead data: No lead data provided. Please provide at least one field (name, phone, course, etc.)"
+            
+            # Save in the background - lookup and write happen off the reply path
+            _queue_lead_write(supabase_service, {
+                "name": name,
+                "phone": phone,
+                "selected_course": selected_course,
+                "education_level": education_level,
+                "goal": goal,
+                "notes": notes,
+                "add_timestamp": add_timestamp
+            })
+            return "✓ Lead data accepted successfully and is being saved. You can now share the demo link."
 
         except Exception as e:
-            logger.error(f"Error in append_lead_data tool: {e}", exc_info=True)
+            logger.error("Error in append_lead_data tool: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return f"Error saving lead data: {str(e)}"
 
     tools.append(append_lead_data)
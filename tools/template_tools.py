@@ -11,6 +11,11 @@ import threading
 from typing import Optional
 from langchain_core.tools import tool
 
+try:
+    import orjson  # C JSON parser; installed with langchain-core (via langsmith)
+except ImportError:
+    orjson = None
+
 
 # Load templates once at module level
 TEMPLATES_PATH = os.path.join(
@@ -25,18 +30,28 @@ _templates_lock = threading.Lock()
 def _load_templates() -> dict:
     """Load templates from JSON file."""
     try:
-        with open(TEMPLATES_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(TEMPLATES_PATH, 'rb') as f:
+            data = f.read()
+        return orjson.loads(data) if orjson else json.loads(data)
     except FileNotFoundError:
         print(f"Warning: Templates file not found at {TEMPLATES_PATH}")
         return {}
-    except json.JSONDecodeError as e:
+    except json.JSONDecodeError as e:  # orjson.JSONDecodeError subclasses it
         print(f"Warning: Invalid JSON in templates file: {e}")
         return {}
 
 
 TEMPLATES = _load_templates()
 
+# list_available_templates output, rebuilt only when TEMPLATES is replaced
+# (startup or reload): (templates dict it was built from, listing text)
+_templates_listing: tuple = (None, "")
+
+# get_message_template results per (template_name, language), dropped when
+# TEMPLATES is replaced: (templates dict they came from, results)
+_resolved_templates: tuple = (None, {})
+RESOLVED_TEMPLATES_MAX_ENTRIES = 1024
+
 
 def reload_templates() -> dict:
     """
@@ -60,6 +75,29 @@ def reload_templates() -> dict:
         return TEMPLATES
 
 
+def _resolve_template(templates: dict, template_name: str, language: Optional[str]) -> str:
+    """Pick the requested language version of a template, falling back to mixed, english, then urdu."""
+    if template_name not in templates:
+        available = ", ".join(list(templates.keys())[:10]) + "..."
+        return f"Error: Template '{template_name}' not found. Available templates: {available}"
+
+    template_data = templates[template_name]
+
+    # Try to get requested language
+    if language in template_data:
+        return template_data[language]
+
+    # Fallback to other available languages
+    if "mixed" in template_data:
+        return f"[Note: {language} not available, using mixed version]\n\n{template_data['mixed']}"
+    elif "english" in template_data:
+        return f"[Note: {language} not available, using english version]\n\n{template_data['english']}"
+    elif "urdu" in template_data:
+        return f"[Note: {language} not available, using urdu version]\n\n{template_data['urdu']}"
+
+    return f"Error: No language version available for template '{template_name}'"
+
+
 @tool
 def get_message_template(
     template_name: str,
@@ -140,25 +178,20 @@ def get_message_template(
     if not TEMPLATES:
         return "Error: Templates not loaded. Please check templates.json file."
 
-    if template_name not in TEMPLATES:
-        available = ", ".join(list(TEMPLATES.keys())[:10]) + "..."
-        return f"Error: Template '{template_name}' not found. Available templates: {available}"
-
-    template_data = TEMPLATES[template_name]
-
-    # Try to get requested language
-    if language in template_data:
-        return template_data[language]
-
-    # Fallback to other available languages
-    if "mixed" in template_data:
-        return f"[Note: {language} not available, using mixed version]\n\n{template_data['mixed']}"
-    elif "english" in template_data:
-        return f"[Note: {language} not available, using english version]\n\n{template_data['english']}"
-    elif "urdu" in template_data:
-        return f"[Note: {language} not available, using urdu version]\n\n{template_data['urdu']}"
-
-    return f"Error: No language version available for template '{template_name}'"
+    global _resolved_templates
+    templates = TEMPLATES
+    source, resolved = _resolved_templates
+    if source is not templates:
+        resolved = {}
+        _resolved_templates = (templates, resolved)
+
+    key = (template_name, language)
+    result = resolved.get(key)
+    if result is None:
+        result = _resolve_template(templates, template_name, language)
+        if len(resolved) < RESOLVED_TEMPLATES_MAX_ENTRIES:
+            resolved[key] = result
+    return result
 
 
 @tool
@@ -175,13 +208,19 @@ def list_available_templates() -> str:
     if not TEMPLATES:
         return "Error: Templates not loaded."
 
-    result = "Available Message Templates:\n\n"
-    for name, data in TEMPLATES.items():
-        description = data.get("description", "No description")
-        languages = [k for k in data.keys() if k != "description"]
-        result += f"- {name}\n  Description: {description}\n  Languages: {', '.join(languages)}\n\n"
-
-    return result
+    global _templates_listing
+    templates = TEMPLATES
+    source, listing = _templates_listing
+    if source is not templates:
+        entries = []
+        for name, data in templates.items():
+            description = data.get("description", "No description")
+            languages = [k for k in data.keys() if k != "description"]
+            entries.append(f"- {name}\n  Description: {description}\n  Languages: {', '.join(languages)}\n\n")
+        listing = "Available Message Templates:\n\n" + "".join(entries)
+        _templates_listing = (templates, listing)
+
+    return listing
 
 
 # Export tools as a list for easy import
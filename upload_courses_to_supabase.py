@@ -2,10 +2,14 @@
 import os
 import csv
 from dotenv import load_dotenv
+from postgrest.types import ReturnMethod
 from core.supabase_service import SupabaseService
 
 load_dotenv()
 
+# Rows per upsert request (keeps each PostgREST payload well under its size limit)
+BATCH_SIZE = 500
+
 # Initialize Supabase
 print("Connecting to Supabase...")
 supabase = SupabaseService(
@@ -13,53 +17,68 @@ supabase = SupabaseService(
     supabase_key=os.getenv("SUPABASE_KEY")
 )
 
-# Read CSV file
-print("\nReading course_details_rows.csv...")
-courses = []
-with open('course_details_rows.csv', 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    courses = list(reader)
-
-print(f"Found {len(courses)} courses in CSV")
-
 # Check current database state
 print("\nChecking current database...")
 existing = supabase.client.table('course_details').select('course_name').execute()
 print(f"Current courses in database: {len(existing.data)}")
 
-if existing.data:
-    print("\nWARNING: Database already has courses. Options:")
-    print("1. Delete all and re-upload (recommended if data is outdated)")
-    print("2. Skip upload (keep existing data)")
-    choice = input("\nEnter choice (1 or 2): ").strip()
-
-    if choice == "1":
-        print("\nDeleting existing courses...")
-        # Delete all existing courses
-        for course in existing.data:
-            supabase.client.table('course_details').delete().eq('course_name', course['course_name']).execute()
-        print("✓ Deleted all existing courses")
-    else:
-        print("Skipping upload. Exiting...")
-        exit(0)
-
-# Upload courses
-print(f"\nUploading {len(courses)} courses to Supabase...")
+# Upsert courses: existing rows are updated in place (matched on the unique
+# course_name), so the table is never empty while live traffic reads it
+print("\nUploading course_details_rows.csv to Supabase...")
+row_count = 0
 success_count = 0
 error_count = 0
+csv_names = set()
+# Current batch, one row per course_name (a later CSV row wins), since an
+# upsert can't touch the same row twice
+batch = {}
+
 
-for i, course in enumerate(courses, 1):
+def upsert_batch():
+    """Upsert the current batch in one request (without echoing rows back) and report it."""
+    global success_count, error_count
+    rows = list(batch.values())
+    batch.clear()
     try:
+        supabase.client.table('course_details').upsert(
+            rows, on_conflict='course_name', returning=ReturnMethod.minimal
+        ).execute()
+        success_count += len(rows)
+        for course in rows:
+            print(f"✓ {course['course_name']}")
+    except Exception as e:
+        error_count += len(rows)
+        print(f"✗ Batch of {len(rows)} courses failed - Error: {e}")
+
+
+# Stream the CSV: only BATCH_SIZE rows are held in memory at a time
+with open('course_details_rows.csv', 'r', encoding='utf-8') as f:
+    reader = csv.DictReader(f)
+    for course in reader:
+        row_count += 1
         # Clean empty strings to None
         cleaned_course = {k: (v if v != '' else None) for k, v in course.items()}
+        course_name = cleaned_course.get('course_name')
+        # course_name is the upsert key; a row without one can't be matched or stored
+        if not course_name:
+            error_count += 1
+            print(f"✗ CSV line {reader.line_num} skipped - Error: no course_name")
+            continue
+        csv_names.add(course_name)
+        batch[course_name] = cleaned_course
+        if len(batch) == BATCH_SIZE:
+            upsert_batch()
+if batch:
+    upsert_batch()
 
-        # Insert course
-        result = supabase.client.table('course_details').insert(cleaned_course).execute()
-        success_count += 1
-        print(f"✓ {i}/{len(courses)}: {course.get('course_name', 'Unknown')}")
-    except Exception as e:
-        error_count += 1
-        print(f"✗ {i}/{len(courses)}: {course.get('course_name', 'Unknown')} - Error: {e}")
+print(f"Read {row_count} courses from CSV")
+
+# Remove courses that are no longer in the CSV (skipped if any batch failed)
+stale_names = [course['course_name'] for course in existing.data if course.get('course_name') and course['course_name'] not in csv_names]
+if stale_names and not error_count:
+    print(f"\nRemoving {len(stale_names)} courses not in CSV...")
+    supabase.client.table('course_details').delete().in_('course_name', stale_names).execute()
+    print("✓ Removed courses not in CSV")
 
 print("\n" + "="*70)
 print(f"Upload Complete!")